@@ -1,36 +1,69 @@
 import json
 import os
+import threading
 import utils.zw_logging
+import utils.fast_json
 
 # Global character data
 character_data = {}
 character_prompt = ""
+_prompt_version = 0  # Bumped whenever character_prompt is rebuilt
+_card_mtime_ns = None  # mtime of the card file character_data was parsed from
+_loaded = False
+_load_lock = threading.Lock()
 
 def load_character_card():
     """Load character card from JSON file"""
-    global character_data, character_prompt
+    global character_data, character_prompt, _prompt_version, _card_mtime_ns
     
-    card_path = os.getenv("CHARACTER_CARD_PATH", "Configurables/CharacterCards/default.json")
+    card_path = _get_card_path()
     
-    try:
-        with open(card_path, 'r', encoding='utf-8') as f:
-            character_data = json.load(f)
-        
-        # Build character prompt
-        character_prompt = build_character_prompt()
-        
-        utils.zw_logging.update_debug_log(f"Character card loaded: {character_data.get('name', 'Unknown')}")
-        print(f"Character loaded: {character_data.get('name', 'Unknown')}")
-        
-    except FileNotFoundError:
-        utils.zw_logging.update_debug_log(f"Character card not found: {card_path}")
-        create_default_character_card(card_path)
-        load_character_card()  # Retry loading
+    # One retry after writing the default card, never more
+    for attempt in range(2):
+        try:
+            with open(card_path, 'rb', buffering=65536) as f:
+                mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+                character_data = utils.fast_json.loads(f.read())
+            
+            # Build character prompt
+            character_prompt = build_character_prompt()
+            _prompt_version += 1
+            _card_mtime_ns = mtime_ns
+            
+            utils.zw_logging.update_debug_log(f"Character card loaded: {character_data.get('name', 'Unknown')}")
+            print(f"Character loaded: {character_data.get('name', 'Unknown')}")
+            return
+            
+        except FileNotFoundError:
+            utils.zw_logging.update_debug_log(f"Character card not found: {card_path}")
+            
+        except json.JSONDecodeError as e:
+            utils.zw_logging.update_debug_log(f"Invalid JSON in character card: {e}")
         
-    except json.JSONDecodeError as e:
-        utils.zw_logging.update_debug_log(f"Invalid JSON in character card: {e}")
-        create_default_character_card(card_path)
-        load_character_card()  # Retry loading
+        if attempt == 0:
+            try:
+                create_default_character_card(card_path)
+            except OSError as e:
+                utils.zw_logging.update_debug_log(f"Could not create default character card: {e}")
+                break
+    
+    utils.zw_logging.update_debug_log(f"Giving up on character card: {card_path}")
+
+
+def _get_card_path() -> str:
+    """Get the configured character card path"""
+    return os.getenv("CHARACTER_CARD_PATH", "Configurables/CharacterCards/default.json")
+
+
+def ensure_loaded():
+    """Load the character card on first use"""
+    global _loaded
+    
+    if not _loaded:
+        with _load_lock:
+            if not _loaded:
+                load_character_card()
+                _loaded = True
 
 
 def create_default_character_card(path: str):
@@ -70,8 +103,8 @@ def create_default_character_card(path: str):
         ]
     }
     
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(default_card, f, ensure_ascii=False, indent=2)
+    with open(path, 'wb') as f:
+        f.write(utils.fast_json.dumps(default_card, indent=True))
     
     utils.zw_logging.update_debug_log(f"Created default character card: {path}")
 
@@ -126,39 +159,48 @@ def build_character_prompt() -> str:
 
 def get_character_prompt() -> str:
     """Get the built character prompt"""
+    ensure_loaded()
     return character_prompt
 
 
 def get_character_name() -> str:
     """Get the character name"""
+    ensure_loaded()
     return character_data.get('name', 'AI')
 
 
 def get_character_data() -> dict:
     """Get the full character data"""
+    ensure_loaded()
     return character_data.copy()
 
 
 def update_character_data(new_data: dict):
     """Update character data"""
-    global character_data, character_prompt
+    global character_data, character_prompt, _prompt_version, _card_mtime_ns
+    ensure_loaded()
     character_data.update(new_data)
     character_prompt = build_character_prompt()
+    _prompt_version += 1
     
     # Save updated data
-    card_path = os.getenv("CHARACTER_CARD_PATH", "Configurables/CharacterCards/default.json")
+    card_path = _get_card_path()
     try:
-        with open(card_path, 'w', encoding='utf-8') as f:
-            json.dump(character_data, f, ensure_ascii=False, indent=2)
+        with open(card_path, 'wb') as f:
+            f.write(utils.fast_json.dumps(character_data, indent=True))
+        _card_mtime_ns = os.stat(card_path).st_mtime_ns  # In-memory data already matches the file
         utils.zw_logging.update_debug_log("Character data updated and saved")
     except Exception as e:
         utils.zw_logging.update_debug_log(f"Failed to save character data: {e}")
 
 
 def reload_character_card():
-    """Reload character card from file"""
+    """Reload character card from file, skipping the parse if it has not changed"""
+    try:
+        if os.stat(_get_card_path()).st_mtime_ns == _card_mtime_ns:
+            return
+    except OSError:
+        pass
+    
     load_character_card()
 
-
-# Initialize on import
-load_character_card()
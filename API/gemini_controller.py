@@ -1,25 +1,65 @@
 import os
+import re
+import sys
 import time
-import json
+import hashlib
 import threading
+import itertools
+import dataclasses
+from collections import deque, OrderedDict
 import google.generativeai as genai
-from typing import List, Dict, Any, Optional, Generator
+from typing import List, Dict, Any, Deque
 import utils.settings
 import utils.zw_logging
+import utils.log_conversion
+import utils.fast_json
 import API.character_card
 
 # Global variables
-conversation_history: List[Dict[str, str]] = []
+# Bounded so long sessions don't grow memory without limit
+conversation_history: Deque[Dict[str, str]] = deque(maxlen=200)
+# Gemini-ready turns for the context window, kept in step with conversation_history
+history_contents: Deque[Dict[str, Any]] = deque(maxlen=20)
 last_response: str = ""
 last_message_streamed: bool = False
 is_generating: bool = False
-should_stop_generation: bool = False
+_stop_event = threading.Event()  # Set from UI/hotkey threads to cut off the current stream
+_init_lock = threading.Lock()
 current_model = None
 generation_config = None
+model_name: str = ""
+
+# Character prompt version the current model's system instruction was built from
+_system_instruction_version: int = -1
+
+_GEMINI_ROLES = {"user": "user", "assistant": "model"}
+
+# Streaming state: chunks of the in-flight response, joined into last_response on demand
+_stream_parts: List[str] = []
+_stream_joined_count: int = 0
+_stream_interrupted: bool = False
+
+# Responses for identical turns (same character, recent history and input), most recent last
+_RESPONSE_CACHE_SIZE = 256
+_RESPONSE_CACHE_HISTORY = 6  # Recent history entries that are part of the cache key
+_response_cache: "OrderedDict[bytes, str]" = OrderedDict()
+
+_STREAM_ERROR_RESPONSE = "I'm having trouble with streaming. Let me try again."
+_GENERATION_ERROR_RESPONSE = "I'm having trouble generating a response right now."
+
+# Console output for streamed chunks is batched by size or age instead of flushed per token
+_STREAM_FLUSH_CHARS = 64
+_STREAM_FLUSH_INTERVAL = 0.05  # seconds
+_STREAM_FLUSH_ENDINGS = ('.', '!', '?', '\n')  # Show whole sentences as soon as they finish
+_stdout_write = sys.stdout.write
+_stdout_flush = sys.stdout.flush
+
+# Roleplay actions in [brackets] or (parentheses), stripped in a single pass
+_RP_ACTION_RE = re.compile(r'\[[^\]\n]*\]|\([^)\n]*\)')
 
 def initialize():
     """Initialize the Gemini API client"""
-    global current_model, generation_config
+    global model_name, generation_config, _system_instruction_version
     
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
@@ -28,7 +68,8 @@ def initialize():
     genai.configure(api_key=api_key)
     
     model_name = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")
-    current_model = genai.GenerativeModel(model_name)
+    _system_instruction_version = -1
+    _get_model()
     
     # Configure generation parameters
     generation_config = genai.types.GenerationConfig(
@@ -42,56 +83,121 @@ def initialize():
     print(f"Gemini API ready with model: {model_name}")
 
 
-def build_conversation_context() -> str:
-    """Build the conversation context including character card and history"""
-    character_info = API.character_card.get_character_prompt()
+def ensure_initialized() -> bool:
+    """Initialize the Gemini API client on first use, returns whether it is ready"""
+    if generation_config is None:
+        with _init_lock:
+            if generation_config is None:
+                try:
+                    initialize()
+                except Exception as e:
+                    print(f"Warning: Could not initialize Gemini API: {e}")
+                    utils.zw_logging.update_debug_log(f"Gemini initialization failed: {e}")
     
-    context_parts = [
-        "You are an AI VTuber assistant. Follow these guidelines:",
-        character_info,
-        "",
-        "Current conversation history:"
-    ]
+    return generation_config is not None
+
+
+def _get_model():
+    """Get the Gemini model, rebuilding it only when the character prompt changed"""
+    global current_model, _system_instruction_version
     
-    # Add recent conversation history (last 10 exchanges)
-    recent_history = conversation_history[-20:] if len(conversation_history) > 20 else conversation_history
+    # The character card goes in the system instruction so every request shares
+    # the same stable prefix, which lets Gemini's server-side prefix caching hit
+    API.character_card.ensure_loaded()
+    if _system_instruction_version != API.character_card._prompt_version:
+        system_instruction = "\n".join([
+            "You are an AI VTuber assistant. Follow these guidelines:",
+            API.character_card.get_character_prompt()
+        ])
+        current_model = genai.GenerativeModel(model_name, system_instruction=system_instruction)
+        _system_instruction_version = API.character_card._prompt_version
     
-    for entry in recent_history:
-        if entry['role'] == 'user':
-            context_parts.append(f"User: {entry['content']}")
-        else:
-            context_parts.append(f"Assistant: {entry['content']}")
-    
-    return "\n".join(context_parts)
+    return current_model
+
+
+def build_conversation_contents() -> List[Dict[str, Any]]:
+    """Build the Gemini contents for the next request from the recent conversation history"""
+    # Recent conversation history (last 10 exchanges), already in Gemini format. Gemini
+    # rejects contents that open with a model turn, which eviction can leave at the front
+    contents = list(history_contents)
+    start = 0
+    while start < len(contents) and contents[start]["role"] != "user":
+        start += 1
+    return contents[start:]
 
 
-def send_message(user_input: str) -> None:
+def _append_history(role: str, content: str) -> None:
+    """Append an entry to the conversation history along with its Gemini content turn"""
+    conversation_history.append({"role": role, "content": content})
+    history_contents.append({"role": _GEMINI_ROLES.get(role, "model"), "parts": [content]})
+
+
+def _pop_trailing_user_turn() -> None:
+    """Drop an unanswered user turn from the end of the history so turns stay paired"""
+    if conversation_history and conversation_history[-1]['role'] == 'user':
+        conversation_history.pop()
+    if history_contents and history_contents[-1]['role'] == 'user':
+        history_contents.pop()
+
+
+def _response_cache_key(user_input: str) -> bytes:
+    """Hash the character prompt version, recent history and new input into a response cache key"""
+    recent_history = [
+        [entry['role'], entry['content']]
+        for entry in itertools.islice(reversed(conversation_history), _RESPONSE_CACHE_HISTORY)
+    ]
+    canonical = utils.fast_json.dumps([API.character_card._prompt_version, recent_history, user_input])
+    return hashlib.blake2b(canonical, digest_size=16).digest()
+
+
+def send_message(user_input: str, use_cache: bool = True) -> None:
     """Send a message to Gemini and handle the response"""
     global conversation_history, last_response, last_message_streamed, is_generating
     
+    ensure_initialized()
+    
     try:
-        # Add user message to history
-        conversation_history.append({"role": "user", "content": user_input})
+        cache_key = _response_cache_key(user_input)
         
-        # Build context
-        context = build_conversation_context()
+        # Add user message to history
+        _append_history("user", user_input)
         
         is_generating = True
         
-        if utils.settings.stream_chats:
-            # Stream the response
-            last_message_streamed = True
-            response_text = _stream_response(context, user_input)
-        else:
-            # Generate complete response
+        cached_response = _response_cache.get(cache_key) if use_cache else None
+        if cached_response is not None:
+            # Identical turn seen before, reuse the answer instead of calling Gemini
+            _response_cache.move_to_end(cache_key)
             last_message_streamed = False
-            response_text = _generate_complete_response(context, user_input)
-        
-        # Clean up the response
-        response_text = _clean_response(response_text)
+            response_text = cached_response
+        else:
+            # Build context
+            contents = build_conversation_contents()
+            
+            if utils.settings.stream_chats:
+                # Stream the response
+                last_message_streamed = True
+                response_text = _stream_response(contents)
+            else:
+                # Generate complete response
+                last_message_streamed = False
+                response_text = _generate_complete_response(contents)
+            
+            # Only complete, successful responses are worth reusing
+            cacheable = (bool(response_text)
+                         and response_text not in (_STREAM_ERROR_RESPONSE, _GENERATION_ERROR_RESPONSE)
+                         and not (last_message_streamed and _stream_interrupted))
+            
+            # Clean up the response
+            response_text = _clean_response(response_text)
+            
+            if cacheable:
+                _response_cache[cache_key] = response_text
+                if len(_response_cache) > _RESPONSE_CACHE_SIZE:
+                    _response_cache.popitem(last=False)
         
         # Add assistant response to history
-        conversation_history.append({"role": "assistant", "content": response_text})
+        _append_history("assistant", response_text)
         last_response = response_text
         
         # Save conversation to log
@@ -104,53 +210,99 @@ def send_message(user_input: str) -> None:
         utils.zw_logging.update_debug_log(error_msg)
         last_response = "I'm having trouble thinking right now. Could you try again?"
         print(f"Gemini API Error: {e}")
+        
+        # The user turn never got a reply, don't leave it to pair with the next message
+        _pop_trailing_user_turn()
     finally:
         is_generating = False
 
 
-def _stream_response(context: str, user_input: str) -> str:
+def _oneshot_config(overrides: dict = None):
+    """The shared generation config, with any per-caller fields replaced (None unsets a limit)"""
+    if not overrides:
+        return generation_config
+    return dataclasses.replace(generation_config, **overrides)
+
+
+def send_message_oneshot(contents, stream: bool = False, generation_overrides: dict = None):
+    """Generate from standalone contents on the shared model, leaving the conversation history alone"""
+    ensure_initialized()
+    return _get_model().generate_content(contents, generation_config=_oneshot_config(generation_overrides), stream=stream)
+
+
+async def send_message_oneshot_async(contents, stream: bool = False, generation_overrides: dict = None):
+    """Async version of send_message_oneshot for callers on an event loop"""
+    ensure_initialized()
+    return await _get_model().generate_content_async(contents, generation_config=_oneshot_config(generation_overrides),
+                                                     stream=stream)
+
+
+def _stream_response(contents: List[Dict[str, Any]]) -> str:
     """Stream response from Gemini"""
-    global should_stop_generation, last_response
+    global last_response, _stream_parts, _stream_joined_count, _stream_interrupted
+    
+    _stream_parts = response_parts = []
+    _stream_joined_count = 0
+    _stream_interrupted = False
+    pending_output = []
+    pending_chars = 0
+    last_flush = time.monotonic()
     
     try:
-        prompt = f"{context}\n\nUser: {user_input}\nAssistant:"
-        
-        response_parts = []
-        
-        response = current_model.generate_content(
-            prompt,
+        response = _get_model().generate_content(
+            contents,
             generation_config=generation_config,
             stream=True
         )
         
         for chunk in response:
-            if should_stop_generation:
-                should_stop_generation = False
+            if _stop_event.is_set():
+                _stop_event.clear()
+                _stream_interrupted = True
                 break
-                
-            if chunk.text:
-                response_parts.append(chunk.text)
-                # Update last_response for real-time display
-                last_response = ''.join(response_parts)
+            
+            text = chunk.text
+            if text:
+                # last_response is materialized lazily by get_last_response()
+                response_parts.append(text)
                 
                 # Optional: Handle streaming display here
                 if utils.settings.stream_chats:
-                    print(chunk.text, end='', flush=True)
+                    pending_output.append(text)
+                    pending_chars += len(text)
+                    now = time.monotonic()
+                    if (pending_chars >= _STREAM_FLUSH_CHARS or now - last_flush >= _STREAM_FLUSH_INTERVAL
+                            or text.endswith(_STREAM_FLUSH_ENDINGS)):
+                        _write_stream_output(pending_output)
+                        pending_chars = 0
+                        last_flush = now
         
         return ''.join(response_parts)
         
     except Exception as e:
         utils.zw_logging.update_debug_log(f"Streaming error: {str(e)}")
-        return "I'm having trouble with streaming. Let me try again."
+        return _STREAM_ERROR_RESPONSE
+    finally:
+        if pending_output:
+            _write_stream_output(pending_output)
+        if response_parts:
+            last_response = ''.join(response_parts)
+        _stream_parts = []
+        _stream_joined_count = 0
+
 
+def _write_stream_output(parts: List[str]) -> None:
+    """Write buffered stream chunks to the console in one go"""
+    _stdout_write(''.join(parts))
+    _stdout_flush()
+    parts.clear()
 
-def _generate_complete_response(context: str, user_input: str) -> str:
+
+def _generate_complete_response(contents: List[Dict[str, Any]]) -> str:
     """Generate complete response from Gemini"""
     try:
-        prompt = f"{context}\n\nUser: {user_input}\nAssistant:"
-        
-        response = current_model.generate_content(
-            prompt,
+        response = _get_model().generate_content(
+            contents,
             generation_config=generation_config
         )
         
@@ -158,7 +310,7 @@ def _generate_complete_response(context: str, user_input: str) -> str:
         
     except Exception as e:
         utils.zw_logging.update_debug_log(f"Generation error: {str(e)}")
-        return "I'm having trouble generating a response right now."
+        return _GENERATION_ERROR_RESPONSE
 
 
 def _clean_response(text: str) -> str:
@@ -179,9 +331,7 @@ def _clean_response(text: str) -> str:
     # Apply RP suppression if enabled
     if utils.settings.rp_suppression:
         # Remove roleplay actions in brackets or parentheses
-        import re
-        text = re.sub(r'\[.*?\]', '', text)
-        text = re.sub(r'\(.*?\)', '', text)
+        text = _RP_ACTION_RE.sub('', text)
     
     # Apply newline cut if enabled
     if utils.settings.newline_cut:
@@ -193,6 +343,13 @@ def _clean_response(text: str) -> str:
 
 def get_last_response() -> str:
     """Get the last generated response"""
+    global last_response, _stream_joined_count
+    
+    # While streaming, only re-join when new chunks have arrived since the last call
+    if len(_stream_parts) != _stream_joined_count:
+        last_response = ''.join(_stream_parts)
+        _stream_joined_count = len(_stream_parts)
+    
     return last_response
 
 
@@ -204,6 +361,7 @@ def regenerate_last_response() -> None:
         # Remove the last assistant response
         if conversation_history[-1]['role'] == 'assistant':
             conversation_history.pop()
+            history_contents.pop()
         
         # Get the last user message
         last_user_message = None
@@ -213,57 +371,47 @@ def regenerate_last_response() -> None:
                 break
         
         if last_user_message:
-            send_message(last_user_message)
+            # send_message appends the user turn again, so take the old one off first. The
+            # history now matches the original turn, so skip the cache to get a new answer
+            _pop_trailing_user_turn()
+            send_message(last_user_message, use_cache=False)
 
 
 def stop_generation() -> None:
     """Stop the current generation"""
-    global should_stop_generation
-    should_stop_generation = True
+    _stop_event.set()
 
 
 def set_max_tokens(max_tokens: int) -> None:
     """Set maximum tokens for generation"""
     global generation_config
+    ensure_initialized()
     generation_config.max_output_tokens = max_tokens
 
 
 def clear_conversation_history() -> None:
     """Clear the conversation history"""
-    global conversation_history
-    conversation_history = []
+    conversation_history.clear()
+    history_contents.clear()
     utils.zw_logging.update_debug_log("Conversation history cleared")
 
 
 def _save_conversation_log() -> None:
     """Save conversation to log file"""
     try:
-        log_data = []
-        
         # Convert conversation history to simple format
         user_message = ""
         assistant_message = ""
         
-        for entry in conversation_history[-2:]:  # Get last exchange
+        for entry in itertools.islice(reversed(conversation_history), 2):  # Get last exchange
             if entry['role'] == 'user':
                 user_message = entry['content']
             elif entry['role'] == 'assistant':
                 assistant_message = entry['content']
         
         if user_message and assistant_message:
-            # Load existing log
-            try:
-                with open('LiveLog.json', 'r', encoding='utf-8') as f:
-                    log_data = json.load(f)
-            except (FileNotFoundError, json.JSONDecodeError):
-                log_data = []
-            
-            # Add new exchange
-            log_data.append([user_message, assistant_message])
-            
-            # Save updated log
-            with open('LiveLog.json', 'w', encoding='utf-8') as f:
-                json.dump(log_data, f, ensure_ascii=False, indent=2)
+            # Append only the new exchange instead of re-reading and re-writing the whole log
+            utils.log_conversion.append_live_log_entry([user_message, assistant_message])
                 
     except Exception as e:
         utils.zw_logging.update_debug_log(f"Error saving conversation log: {str(e)}")
@@ -300,10 +448,3 @@ def set_force_skip_streaming(skip: bool) -> None:
     if skip:
         stop_generation()
 
-
-# Initialize on import
-try:
-    initialize()
-except Exception as e:
-    print(f"Warning: Could not initialize Gemini API: {e}")
-    utils.zw_logging.update_debug_log(f"Gemini initialization failed: {e}")
@@ -1,10 +1,14 @@
 import json
 import os
+import threading
 import utils.zw_logging
+import utils.fast_json
 
 # Global task data
 current_task = None
-available_tasks = {}
+available_tasks = {}  # Task name -> profile dict, or the raw JSON bytes until first use
+_loaded = False
+_load_lock = threading.Lock()
 
 def load_task_profiles():
     """Load task profiles from configuration"""
@@ -17,15 +21,13 @@ def load_task_profiles():
             os.makedirs(tasks_path, exist_ok=True)
             create_default_tasks()
         
-        # Load all task files
-        for filename in os.listdir(tasks_path):
-            if filename.endswith('.json'):
-                task_name = filename[:-5]  # Remove .json
-                try:
-                    with open(os.path.join(tasks_path, filename), 'r', encoding='utf-8') as f:
-                        available_tasks[task_name] = json.load(f)
-                except json.JSONDecodeError as e:
-                    utils.zw_logging.update_debug_log(f"Invalid JSON in task file {filename}: {e}")
+        # Load all task files, parsing is deferred until a task is actually used
+        with os.scandir(tasks_path) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith('.json'):
+                    task_name = entry.name[:-5]  # Remove .json
+                    with open(entry.path, 'rb', buffering=65536) as f:
+                        available_tasks[task_name] = f.read()
         
         utils.zw_logging.update_debug_log(f"Loaded {len(available_tasks)} task profiles")
         
@@ -33,6 +35,17 @@ def load_task_profiles():
         utils.zw_logging.update_debug_log(f"Error loading task profiles: {e}")
 
 
+def ensure_loaded():
+    """Load task profiles on first use"""
+    global _loaded
+    
+    if not _loaded:
+        with _load_lock:
+            if not _loaded:
+                load_task_profiles()
+                _loaded = True
+
+
 def create_default_tasks():
     """Create default task profiles"""
     tasks_path = "Configurables/Tasks/"
@@ -98,18 +111,36 @@ def create_default_tasks():
     
     for task_name, task_data in default_tasks.items():
         task_path = os.path.join(tasks_path, f"{task_name}.json")
-        with open(task_path, 'w', encoding='utf-8') as f:
-            json.dump(task_data, f, ensure_ascii=False, indent=2)
+        with open(task_path, 'wb') as f:
+            f.write(utils.fast_json.dumps(task_data, indent=True))
     
     utils.zw_logging.update_debug_log("Created default task profiles")
 
 
+def _get_task(task_name: str):
+    """Get a task profile, parsing its JSON on first access"""
+    ensure_loaded()
+    task = available_tasks.get(task_name)
+    
+    if isinstance(task, bytes):
+        try:
+            task = utils.fast_json.loads(task)
+            available_tasks[task_name] = task
+        except json.JSONDecodeError as e:
+            utils.zw_logging.update_debug_log(f"Invalid JSON in task file {task_name}.json: {e}")
+            del available_tasks[task_name]
+            task = None
+    
+    return task
+
+
 def set_current_task(task_name: str):
     """Set the current active task"""
     global current_task
     
-    if task_name in available_tasks:
-        current_task = available_tasks[task_name]
+    task = _get_task(task_name)
+    if task is not None:
+        current_task = task
         utils.zw_logging.update_debug_log(f"Task set to: {task_name}")
         return True
     else:
@@ -152,12 +183,14 @@ def get_current_task_prompt():
 
 def get_available_tasks():
     """Get list of available task names"""
+    ensure_loaded()
     return list(available_tasks.keys())
 
 
 def get_task_info(task_name: str):
     """Get information about a specific task"""
-    return available_tasks.get(task_name, {})
+    task = _get_task(task_name)
+    return task if task is not None else {}
 
 
 def clear_current_task():
@@ -166,6 +199,3 @@ def clear_current_task():
     current_task = None
     utils.zw_logging.update_debug_log("Task cleared")
 
-
-# Initialize on import
-load_task_profiles()
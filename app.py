@@ -6,6 +6,7 @@ Alternative entry point that starts the web UI and main system
 import os
 import sys
 import threading
+import concurrent.futures
 import time
 import webbrowser
 from dotenv import load_dotenv
@@ -18,6 +19,9 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 try:
     import main
+    import API.character_card
+    import API.task_profiles
+    import API.gemini_controller
     import utils.web_ui
     import utils.settings
     import utils.zw_logging
@@ -44,6 +48,19 @@ except ImportError as e:
     utils.settings = MockSettings()
     utils.web_ui = None
 
+def preload_systems():
+    """Load the character card and task profiles while Gemini initializes"""
+    loaders = [
+        API.gemini_controller.ensure_initialized,
+        API.character_card.ensure_loaded,
+        API.task_profiles.ensure_loaded,
+    ]
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(loaders)) as pool:
+        for future in [pool.submit(loader) for loader in loaders]:
+            future.result()
+
+
 def start_application():
     """Start the Z-Waif application with web UI"""
     try:
@@ -55,6 +72,9 @@ def start_application():
         # Load settings
         utils.settings.load_settings()
         
+        # Character, tasks and Gemini are independent, so load them side by side
+        preload_systems()
+        
         # Start web UI in background
         if utils.settings.web_ui_enabled:
             print("🌐 Starting Web UI...")
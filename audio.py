@@ -1,103 +1,179 @@
 import pyaudio
 import wave
+import numpy as np
 import os
+import struct
 import time
 import threading
 import utils.settings
 import utils.zw_logging
 
 # Audio configuration
-CHUNK = 1024
+CHUNK = 2048  # 4 KB / 128 ms per read at 16 kHz
 FORMAT = pyaudio.paInt16
 CHANNELS = 1
-RATE = 44100
+RATE = 16000  # Whisper's native rate, so no resampling is needed downstream
+# Frame counts are reported in the original 1024-sample / 44.1 kHz chunks (~23 ms), so
+# settings like AUTOCHAT_MINIMUM_CHAT_FRAMES keep their meaning whatever CHUNK and RATE are
+LEGACY_FRAME_SECONDS = 1024 / 44100
+WAV_BUFFER_SIZE = 65536  # Bytes buffered before the WAV file is flushed to disk
 
 # Global audio variables
 audio_interface = None
+_input_stream = None  # Kept open between recordings, only started/stopped per recording
+_stream_rate = RATE  # Actual capture rate, falls back to the device default if RATE is unsupported
 is_recording = False
-latest_chat_frame_count = 0
-recorded_frames = []
+latest_chat_frame_count = 0  # Length of the latest recording in legacy frames
+latest_chat_duration = 0.0  # Length of the latest recording in seconds
 
 def initialize():
     """Initialize audio system"""
     global audio_interface
     
     try:
+        _close_input_stream()
         audio_interface = pyaudio.PyAudio()
         utils.zw_logging.update_debug_log("Audio system initialized")
     except Exception as e:
         utils.zw_logging.update_debug_log(f"Audio initialization failed: {e}")
         raise e
+    
+    # Open the microphone up front so recordings don't pay the device open cost
+    try:
+        _get_input_stream()
+    except Exception as e:
+        utils.zw_logging.update_debug_log(f"Could not pre-open microphone stream: {e}")
+
+
+def _get_input_stream():
+    """Get the microphone stream, opening it (stopped) on first use"""
+    global _input_stream, _stream_rate
+    
+    if _input_stream is None:
+        # Ask PortAudio for 16 kHz directly, some host APIs only offer the device's native rate
+        try:
+            _input_stream = _open_input_stream(RATE)
+            _stream_rate = RATE
+        except OSError as e:
+            _stream_rate = int(audio_interface.get_default_input_device_info()['defaultSampleRate'])
+            utils.zw_logging.update_debug_log(f"Microphone does not support {RATE} Hz ({e}), recording at {_stream_rate} Hz")
+            _input_stream = _open_input_stream(_stream_rate)
+    
+    return _input_stream
+
+
+def _open_input_stream(rate: int):
+    """Open a stopped microphone stream at the given sample rate"""
+    return audio_interface.open(
+        format=FORMAT,
+        channels=CHANNELS,
+        rate=rate,
+        input=True,
+        frames_per_buffer=CHUNK,
+        start=False
+    )
+
+
+def _close_input_stream():
+    """Close the microphone stream if it is open"""
+    global _input_stream
+    
+    if _input_stream is not None:
+        try:
+            _input_stream.close()
+        except Exception as e:
+            utils.zw_logging.update_debug_log(f"Error closing microphone stream: {e}")
+        _input_stream = None
+
+
+def record_to_buffer() -> bytes:
+    """Record audio from microphone into an in-memory WAV"""
+    frames = []
+    _capture(frames.append)
+    
+    pcm = b''.join(frames)
+    return _wav_header(len(pcm)) + pcm
 
 
-def record():
-    """Record audio from microphone"""
-    global is_recording, latest_chat_frame_count, recorded_frames
+def _capture(write_frame):
+    """Stream microphone chunks to write_frame until silence or manual stop"""
+    global is_recording, latest_chat_frame_count, latest_chat_duration
     
     if not audio_interface:
         raise RuntimeError("Audio system not initialized")
     
     is_recording = True
-    recorded_frames = []
+    frame_count = 0
     
     try:
-        # Open microphone stream
-        stream = audio_interface.open(
-            format=FORMAT,
-            channels=CHANNELS,
-            rate=RATE,
-            input=True,
-            frames_per_buffer=CHUNK
-        )
+        # Start the warm microphone stream
+        stream = _get_input_stream()
+        stream.start_stream()
         
         print("Recording... Press any key to stop.")
         
         # Record until silence detected or manual stop
-        silence_threshold = 500
+        silence_threshold = 1000  # Peak int16 sample amplitude
         silence_duration = 0
         max_silence = 2.0  # seconds
         
         while is_recording:
             data = stream.read(CHUNK, exception_on_overflow=False)
-            recorded_frames.append(data)
+            write_frame(data)
+            frame_count += 1
             
-            # Simple silence detection
-            audio_level = max(data)
+            # Simple silence detection on the peak int16 sample (int32 math so -32768 doesn't overflow)
+            audio_level = np.abs(np.frombuffer(data, dtype=np.int16), dtype=np.int32).max()
             if audio_level < silence_threshold:
-                silence_duration += CHUNK / RATE
+                silence_duration += CHUNK / _stream_rate
                 if silence_duration > max_silence:
                     break
             else:
                 silence_duration = 0
         
         stream.stop_stream()
-        stream.close()
         
-        latest_chat_frame_count = len(recorded_frames)
+        latest_chat_duration = frame_count * CHUNK / _stream_rate
+        latest_chat_frame_count = round(latest_chat_duration / LEGACY_FRAME_SECONDS)
         
-        # Save recording to file
-        output_file = "temp_recording.wav"
-        save_audio_frames(recorded_frames, output_file)
-        
-        utils.zw_logging.update_debug_log(f"Audio recorded: {latest_chat_frame_count} frames")
-        return output_file
+        utils.zw_logging.update_debug_log(f"Audio recorded: {latest_chat_duration:.2f}s ({latest_chat_frame_count} frames)")
         
     except Exception as e:
         utils.zw_logging.update_debug_log(f"Recording error: {e}")
         raise e
     finally:
         is_recording = False
+        if _input_stream is not None and _input_stream.is_active():
+            _input_stream.stop_stream()
+
+
+def _wav_header(data_size: int) -> bytes:
+    """Build the 44-byte PCM WAV header for data_size bytes of recorded audio"""
+    sample_width = 2  # paInt16
+    block_align = CHANNELS * sample_width
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, 1, CHANNELS, _stream_rate, _stream_rate * block_align, block_align, sample_width * 8,
+        b'data', data_size
+    )
+
+
+def _open_wav_writer(target):
+    """Open a WAV writer on a filename or file object using the recording format"""
+    wf = wave.open(target, 'wb')
+    wf.setnchannels(CHANNELS)
+    wf.setsampwidth(audio_interface.get_sample_size(FORMAT))
+    wf.setframerate(_stream_rate)
+    return wf
 
 
 def save_audio_frames(frames, filename):
     """Save recorded audio frames to file"""
     try:
-        wf = wave.open(filename, 'wb')
-        wf.setnchannels(CHANNELS)
-        wf.setsampwidth(audio_interface.get_sample_size(FORMAT))
-        wf.setframerate(RATE)
-        wf.writeframes(b''.join(frames))
-        wf.close()
+        with open(filename, 'wb', buffering=WAV_BUFFER_SIZE) as raw_file, _open_wav_writer(raw_file) as wf:
+            for frame in frames:
+                wf.writeframes(frame)
     except Exception as e:
         utils.zw_logging.update_debug_log(f"Error saving audio: {e}")
         raise e
@@ -110,7 +186,7 @@ def stop_recording():
 
 
 def get_latest_frame_count():
-    """Get frame count of latest recording"""
+    """Get length of latest recording in legacy 1024-sample / 44.1 kHz frames"""
     return latest_chat_frame_count
 
 
@@ -123,6 +199,8 @@ def cleanup():
     """Clean up audio resources"""
     global audio_interface
     
+    _close_input_stream()
+    
     if audio_interface:
         try:
             audio_interface.terminate()
@@ -6,12 +6,275 @@ Handles Discord bot functionality with memory integration
 import discord
 from discord.ext import commands
 import asyncio
+import functools
 import json
 import os
+import re
+import sqlite3
+import threading
+import time
+import numpy as np
 from typing import Dict, Any, Optional
 from datetime import datetime
 from memory_rag_system import memory_rag_system
-import google.generativeai as genai
+import API.gemini_controller
+
+# Static Discord instructions lead every request, right after the shared model's character
+# system instruction, so requests share a prefix for Gemini's prompt caching. The persona
+# itself comes from that system instruction, so it isn't repeated here
+DISCORD_STYLE_PROMPT = """Reply in Discord chat style. Keep responses:
+- Conversational and engaging
+- Appropriate for Discord (use some Discord formatting if helpful)
+- Reference relevant memories when appropriate
+- Not too long (Discord has message limits)
+
+Use the context provided before each message to give a personalized response."""
+
+# Discord replies aren't held to the voice chat's MAX_TOKENS cap, long ones are split by
+# split_discord instead, so the shared generation config's output limit is lifted for them
+DISCORD_GENERATION_OVERRIDES = {'max_output_tokens': None}
+
+# Streamed replies are sent in pieces at sentence ends, Discord caps messages at 2000 chars
+DISCORD_MESSAGE_LIMIT = 1800
+DISCORD_MIN_SEND = 300  # Short replies still go out as a single message
+SENTENCE_ENDS = ('. ', '! ', '? ', '\n')
+
+# Memory stats are cheap to ask for and expensive to count, reuse them for a while
+STATS_TTL = 30  # seconds
+
+# Rough per-turn token ceilings for the memory context (~4 chars per token)
+CONTEXT_TOKEN_BUDGET = 500
+CONTEXT_LINE_TOKENS = 100
+
+# Memory writes queued by handle_ai_response are committed in batches of up to this many
+MEMORY_WRITE_BATCH = 32
+
+# Small talk that gets no memory retrieval
+SKIP_TOKENS = frozenset({
+    "hi", "hey", "hello", "yo", "sup", "ok", "okay", "k", "kk", "lol", "lmao", "xd",
+    "thanks", "thank you", "thx", "ty", "np", "gm", "gn", "gg", "bye", "cya", "nice", "cool",
+    "yes", "yeah", "yep", "no", "nope", "nah"
+})
+SKIP_RE = re.compile(r"^[\W_]*$")  # Only emoji/punctuation
+
+# Auto-responses in a channel pause after this many consecutive empty retrievals
+EMPTY_RETRIEVAL_LIMIT = 5
+EMPTY_RETRIEVAL_COOLDOWN = 60  # seconds
+
+
+def is_small_talk(text: str) -> bool:
+    """Check if a message is too low-value to retrieve memories for"""
+    stripped = text.strip().lower()
+    return len(stripped) < 3 or stripped in SKIP_TOKENS or SKIP_RE.match(stripped) is not None
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_user_stats(user_id: str, time_bucket: int) -> Dict[str, Any]:
+    """Memory stats for a user, cached per STATS_TTL time bucket"""
+    return memory_rag_system.get_conversation_stats(user_id)
+
+
+@functools.lru_cache(maxsize=2048)
+def _cached_extract(user_message: str) -> Dict[str, Any]:
+    """Topic/sentiment extraction for a message, memoized for repeated messages"""
+    # The extraction only reads the user message, so the reply is left out of the key
+    return memory_rag_system._extract_context(user_message, "")
+
+
+def get_user_stats(user_id: str) -> Dict[str, Any]:
+    """Get memory stats for a user, at most STATS_TTL seconds old"""
+    return _cached_user_stats(user_id, int(time.time() // STATS_TTL))
+
+
+def bound_context(context: str, max_tokens: int = CONTEXT_TOKEN_BUDGET) -> str:
+    """Drop repeated lines from a memory context and cap it to a rough token budget"""
+    budget = max_tokens * 4
+    line_limit = CONTEXT_LINE_TOKENS * 4
+    seen = set()
+    lines = []
+    
+    for line in context.split('\n'):
+        key = line.strip()
+        if key:
+            if key in seen:
+                continue
+            seen.add(key)
+        
+        if len(line) > line_limit:
+            line = line[:line_limit] + '…'
+        
+        budget -= len(line) + 1
+        if budget < 0:
+            break
+        lines.append(line)
+    
+    return '\n'.join(lines)
+
+
+def split_discord(text: str, limit: int = DISCORD_MESSAGE_LIMIT):
+    """Yield message-sized pieces of text, split between lines and otherwise between words"""
+    lines = []
+    size = 0
+    
+    for line in text.split('\n'):
+        # A single line that can't fit on its own is split at the last space before the limit
+        while len(line) > limit:
+            if lines:
+                yield '\n'.join(lines)
+                lines, size = [], 0
+            cut = line.rfind(' ', 0, limit)
+            if cut <= 0:
+                cut = limit
+            yield line[:cut]
+            line = line[cut:].lstrip(' ')
+        
+        if lines and size + len(line) + 1 > limit:
+            yield '\n'.join(lines)
+            lines, size = [], 0
+        lines.append(line)
+        size += len(line) + 1
+    
+    if lines:
+        yield '\n'.join(lines)
+
+
+class ChannelStateStore:
+    """SQLite-backed list of channels the bot auto-responds in, survives restarts"""
+    
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv('DISCORD_STATE_DB', 'zwaif_discord_state.db')
+        # One shared connection, WAL so enable/disable don't each wait on a full fsync
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS response_channels(id INTEGER PRIMARY KEY)")
+        self.conn.commit()
+    
+    def load_channels(self) -> set:
+        """Load the enabled channel ids"""
+        return {row[0] for row in self.conn.execute("SELECT id FROM response_channels")}
+    
+    def add_channel(self, channel_id: int):
+        """Persist an enabled channel"""
+        with self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO response_channels(id) VALUES (?)", (channel_id,))
+    
+    def remove_channel(self, channel_id: int):
+        """Forget a disabled channel"""
+        with self.conn:
+            self.conn.execute("DELETE FROM response_channels WHERE id = ?", (channel_id,))
+
+
+class BatchingEmbedder:
+    """Coalesces query embeddings from concurrent messages into one executor call"""
+    
+    def __init__(self, embedding_model, max_batch: int = 16):
+        self.embedding_model = embedding_model
+        self.max_batch = max_batch
+        self.queue = None
+        self.task = None
+    
+    def start(self):
+        """Start the batching task on the running event loop"""
+        if self.task is None or self.task.done():
+            self.queue = asyncio.Queue()
+            self.task = asyncio.create_task(self._run())
+    
+    async def embed(self, text: str) -> np.ndarray:
+        """Embed a message, batched with any others waiting at the same time"""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, future))
+        return await future
+    
+    async def _run(self):
+        """Drain the queue in batches and resolve each caller's future"""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            # Whatever piles up while the previous batch runs goes into the next one
+            batch = [await self.queue.get()]
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            
+            try:
+                vectors = await loop.run_in_executor(None, self._embed_batch, [text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+    
+    def _embed_batch(self, texts):
+        """Embed a batch of texts with the memory system's embedding model in one pass"""
+        return list(self.embedding_model.embed_texts(texts))
+
+
+class CachedContextProvider:
+    """Approximate cache of memory contexts keyed on the query embedding"""
+    
+    def __init__(self, rag_system, capacity: int = 512, threshold: float = 0.95):
+        self.rag_system = rag_system
+        self.capacity = capacity
+        self.threshold = threshold  # Minimum cosine similarity for a hit
+        self.keys = None  # (capacity, dim) float32 matrix of unit query embeddings
+        self.owners = np.full(capacity, None, dtype=object)  # Contexts are per user, never shared
+        self.contexts = [None] * capacity
+        self.last_used = np.zeros(capacity, dtype=np.int64)  # 0 marks an empty slot
+        self.clock = 0
+    
+    def get_context(self, user_message: str, user_id: str, query_embedding=None) -> str:
+        """Get the memory context for a message, reusing one built for a near-identical message"""
+        if query_embedding is None:
+            query_embedding = self.rag_system.embedding_model.embed_query(user_message)
+        query = np.array(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            # No known words, nothing meaningful to compare against
+            return self.rag_system.build_context_for_response(user_message, user_id, query_embedding=query)
+        query /= norm
+        
+        # The embedding size follows the vocabulary, start over if it changed
+        if self.keys is None or self.keys.shape[1] != query.shape[0]:
+            self.clear(dim=query.shape[0])
+        
+        self.clock += 1
+        
+        scores = self.keys @ query
+        scores[(self.owners != user_id) | (self.last_used == 0)] = -1.0
+        best = int(np.argmax(scores))
+        if scores[best] >= self.threshold:
+            self.last_used[best] = self.clock
+            return self.contexts[best]
+        
+        context = self.rag_system.build_context_for_response(user_message, user_id, query_embedding=query)
+        
+        # Fill the least recently used (or an empty) slot
+        slot = int(np.argmin(self.last_used))
+        self.keys[slot] = query
+        self.owners[slot] = user_id
+        self.contexts[slot] = context
+        self.last_used[slot] = self.clock
+        return context
+    
+    def invalidate(self, user_id: str):
+        """Drop a user's cached contexts so their next message sees newly stored memories"""
+        for slot in np.flatnonzero(self.owners == user_id):
+            self.owners[slot] = None
+            self.contexts[slot] = None
+            self.last_used[slot] = 0
+    
+    def clear(self, dim: int = 0):
+        """Drop all cached contexts"""
+        self.keys = np.zeros((self.capacity, dim), dtype=np.float32)
+        self.owners[:] = None
+        self.contexts = [None] * self.capacity
+        self.last_used[:] = 0
+
 
 class ZWaifDiscordBot(commands.Bot):
     """Discord bot for Z-Waif AI VTuber"""
@@ -28,31 +291,54 @@ class ZWaifDiscordBot(commands.Bot):
             description='Z-Waif AI VTuber Discord Bot'
         )
         
-        self.ai_model = None
-        self.initialize_ai()
+        # Near-duplicate messages ("hi", "gm", ...) reuse the last retrieved context
+        self.context_provider = CachedContextProvider(memory_rag_system)
+        self.embedder = BatchingEmbedder(memory_rag_system.embedding_model)
         
         # Bot configuration
         self.response_channels = set()  # Channels where bot should respond
         self.user_sessions = {}  # Track user conversation sessions
+        self.empty_retrievals = {}  # Channel id -> consecutive empty memory retrievals
+        self.muted_until = {}  # Channel id -> monotonic time auto-responses resume
+        self.global_stats = None  # Refreshed in the background by stats_refresh_loop
+        self.stats_task = None
+        self._mention_re = None  # Matches <@id> and <@!id> for our user, set once logged in
+        self.write_queue = None  # Conversations waiting to be stored, drained by memory_writer_worker
+        self.writer_task = None
+        self.gemini_ready = False  # Set once the shared Gemini client is initialized in on_ready
         
-    def initialize_ai(self):
-        """Initialize Gemini AI model"""
         try:
-            api_key = os.getenv('GEMINI_API_KEY')
-            if api_key:
-                genai.configure(api_key=api_key)
-                self.ai_model = genai.GenerativeModel("gemini-2.0-flash-exp")
-                print("Discord bot AI initialized")
-            else:
-                print("Warning: No Gemini API key found for Discord bot")
-        except Exception as e:
-            print(f"Error initializing Discord bot AI: {e}")
-    
+            self.state_store = ChannelStateStore()
+        except sqlite3.Error as e:
+            print(f"Warning: Discord channel state will not persist: {e}")
+            self.state_store = None
+        
     async def on_ready(self):
         """Called when bot is ready"""
         print(f'{self.user.name} has connected to Discord!')
         print(f'Bot is in {len(self.guilds)} guilds')
         
+        self._mention_re = re.compile(rf"<@!?{self.user.id}>")
+        self.embedder.start()
+        
+        # Initializing reads the character card and configures the SDK, keep it off the loop
+        if not self.gemini_ready:
+            self.gemini_ready = await asyncio.to_thread(API.gemini_controller.ensure_initialized)
+        
+        if self.stats_task is None or self.stats_task.done():
+            self.stats_task = asyncio.create_task(self.stats_refresh_loop())
+        
+        if self.writer_task is None or self.writer_task.done():
+            self.write_queue = asyncio.Queue()
+            self.writer_task = asyncio.create_task(self.memory_writer_worker())
+        
+        # Restore channels enabled before the last restart
+        if self.state_store:
+            try:
+                self.response_channels.update(self.state_store.load_channels())
+            except sqlite3.Error as e:
+                print(f"Error loading Discord channel state: {e}")
+        
         # Set bot presence
         activity = discord.Activity(
             type=discord.ActivityType.streaming,
@@ -70,82 +356,175 @@ class ZWaifDiscordBot(commands.Bot):
         await self.process_commands(message)
         
         # Check if bot should respond in this channel
-        if (message.channel.id in self.response_channels or 
-            isinstance(message.channel, discord.DMChannel) or
-            self.user.mentioned_in(message)):
+        mentioned = self.was_mentioned(message)
+        addressed = mentioned or isinstance(message.channel, discord.DMChannel)
+        if (addressed or
+            (message.channel.id in self.response_channels and
+             time.monotonic() >= self.muted_until.get(message.channel.id, 0))):
             
-            await self.handle_ai_response(message)
+            await self.handle_ai_response(message, mentioned, addressed)
+    
+    async def memory_writer_worker(self):
+        """Store queued conversations and profile updates off the response path"""
+        while True:
+            batch = [await self.write_queue.get()]
+            while len(batch) < MEMORY_WRITE_BATCH and not self.write_queue.empty():
+                batch.append(self.write_queue.get_nowait())
+            
+            try:
+                await self.store_memories(batch)
+            except Exception as e:
+                print(f"Error storing Discord conversations: {e}")
+    
+    async def store_memories(self, batch):
+        """Write a batch off the event loop, then drop the cached contexts it made stale"""
+        try:
+            await asyncio.to_thread(self.write_memories, batch)
+        finally:
+            for user_id in {entry['user_id'] for entry in batch}:
+                self.context_provider.invalidate(user_id)
     
-    async def handle_ai_response(self, message):
+    def write_memories(self, batch):
+        """Store a batch of conversations and update each user's profile"""
+        for entry in batch:
+            memory_rag_system.store_conversation(
+                user_id=entry['user_id'],
+                user_message=entry['user_message'],
+                ai_response=entry['ai_response'],
+                platform='discord',
+                session_id=f"discord_channel_{entry['channel_id']}"
+            )
+            
+            # Update user profile
+            context_data = dict(_cached_extract(entry['user_message']))  # Copy, the cached dict is shared
+            context_data['discord_user'] = entry['author']
+            memory_rag_system.update_user_profile(entry['user_id'], context_data)
+    
+    async def stats_refresh_loop(self):
+        """Keep the overall memory stats fresh without counting them on every command"""
+        while True:
+            try:
+                self.global_stats = await asyncio.to_thread(memory_rag_system.get_conversation_stats)
+            except Exception as e:
+                print(f"Error refreshing memory stats: {e}")
+            await asyncio.sleep(STATS_TTL)
+    
+    def was_mentioned(self, message) -> bool:
+        """Check Discord's parsed mentions for the bot, without scanning the content"""
+        user_id = self.user.id
+        return any(user.id == user_id for user in message.mentions)
+    
+    def record_retrieval(self, channel_id: int, context: str):
+        """Track empty retrievals per channel and pause auto-responses after too many in a row"""
+        if context:
+            self.empty_retrievals.pop(channel_id, None)
+            return
+        
+        misses = self.empty_retrievals.get(channel_id, 0) + 1
+        if misses >= EMPTY_RETRIEVAL_LIMIT:
+            self.muted_until[channel_id] = time.monotonic() + EMPTY_RETRIEVAL_COOLDOWN
+            misses = 0
+        self.empty_retrievals[channel_id] = misses
+    
+    async def handle_ai_response(self, message, mentioned: bool = False, addressed: bool = False):
         """Generate and send AI response"""
         try:
             user_id = f"discord_{message.author.id}"
             user_message = message.content
             
             # Remove bot mention from message
-            if self.user.mentioned_in(message):
-                user_message = user_message.replace(f'<@{self.user.id}>', '').strip()
+            if mentioned:
+                user_message = self._mention_re.sub('', user_message).strip()
             
             if not user_message:
                 return
             
+            small_talk = is_small_talk(user_message)
+            if small_talk and not addressed:
+                # Channel chatter like "lol" or a lone emoji isn't worth a reply
+                return
+            
             # Show typing indicator
             async with message.channel.typing():
-                # Get enhanced context from memory system
-                context = memory_rag_system.build_context_for_response(user_message, user_id)
+                # Get enhanced context from memory system, small talk is answered without it
+                if small_talk:
+                    context = ""
+                else:
+                    query_embedding = await self.embedder.embed(user_message)
+                    context = self.context_provider.get_context(user_message, user_id, query_embedding)
+                    self.record_retrieval(message.channel.id, context)
+                    context = bound_context(context)
                 
-                # Build Discord-specific prompt
-                enhanced_prompt = f"""
-{context}
-
-Current Discord message from {message.author.display_name}: {user_message}
-
-Respond as Aria, the AI VTuber, in Discord chat style. Keep responses:
-- Conversational and engaging
-- Appropriate for Discord (use some Discord formatting if helpful)
-- Reference relevant memories when appropriate
-- Not too long (Discord has message limits)
-
-Use the context above to provide a personalized response.
-"""
+                # Build Discord-specific prompt, most stable parts first and the current message last
+                enhanced_prompt = [DISCORD_STYLE_PROMPT]
+                if context:
+                    enhanced_prompt.append(context)
+                enhanced_prompt.append(f"Current Discord message from {message.author.display_name}: {user_message}")
                 
-                # Generate response
-                if self.ai_model:
-                    response = self.ai_model.generate_content(enhanced_prompt)
-                    ai_response = response.text
+                # Generate response, sending it as it streams in
+                if self.gemini_ready:
+                    ai_response = await self.stream_response(message.channel, enhanced_prompt)
                 else:
                     ai_response = "I'm having trouble connecting to my AI brain right now."
-                
-                # Split long messages if needed
-                if len(ai_response) > 2000:
-                    chunks = [ai_response[i:i+1900] for i in range(0, len(ai_response), 1900)]
-                    for chunk in chunks:
-                        await message.channel.send(chunk)
-                else:
                     await message.channel.send(ai_response)
-                
-                # Store conversation in memory system
-                memory_rag_system.store_conversation(
-                    user_id=user_id,
-                    user_message=user_message,
-                    ai_response=ai_response,
-                    platform='discord',
-                    session_id=f"discord_channel_{message.channel.id}"
-                )
-                
-                # Update user profile
-                context_data = memory_rag_system._extract_context(user_message, ai_response)
-                context_data['discord_user'] = {
+            
+            # Store conversation in memory system in the background
+            entry = {
+                'user_id': user_id,
+                'user_message': user_message,
+                'ai_response': ai_response,
+                'channel_id': message.channel.id,
+                'author': {
                     'username': message.author.name,
                     'display_name': message.author.display_name,
                     'guild': message.guild.name if message.guild else 'DM'
                 }
-                memory_rag_system.update_user_profile(user_id, context_data)
+            }
+            if self.write_queue is not None:
+                await self.write_queue.put(entry)
+            else:
+                await self.store_memories([entry])
         
         except Exception as e:
             print(f"Error handling Discord message: {e}")
             await message.channel.send("Sorry, I encountered an error processing your message.")
     
+    async def stream_response(self, channel, prompt) -> str:
+        """Stream a Gemini response into a channel piece by piece, returns the full text"""
+        response = await API.gemini_controller.send_message_oneshot_async(
+            prompt, stream=True, generation_overrides=DISCORD_GENERATION_OVERRIDES
+        )
+        
+        parts = []
+        buffer = ""
+        async for chunk in response:
+            text = chunk.text
+            if not text:
+                continue
+            parts.append(text)
+            buffer += text
+            
+            # Send everything up to the last finished sentence once enough has built up
+            while len(buffer) >= DISCORD_MIN_SEND:
+                cut = max(buffer.rfind(end, 0, DISCORD_MESSAGE_LIMIT) for end in SENTENCE_ENDS) + 1
+                if cut <= 0:
+                    if len(buffer) < DISCORD_MESSAGE_LIMIT:
+                        break
+                    cut = buffer.rfind(' ', 0, DISCORD_MESSAGE_LIMIT) + 1 or DISCORD_MESSAGE_LIMIT  # No sentence end at all
+                piece, buffer = buffer[:cut], buffer[cut:]
+                await self.send_chunked(channel, piece)
+        
+        await self.send_chunked(channel, buffer)
+        
+        return ''.join(parts)
+    
+    async def send_chunked(self, channel, text: str):
+        """Send text to a channel in as many messages as Discord's length limit needs"""
+        for piece in split_discord(text):
+            piece = piece.strip()
+            if piece:
+                await channel.send(piece)
+    
     @commands.command(name='hello')
     async def hello_command(self, ctx):
         """Say hello to the bot"""
@@ -156,6 +535,8 @@ Use the context above to provide a personalized response.
     async def enable_channel(self, ctx):
         """Enable bot responses in current channel"""
         self.response_channels.add(ctx.channel.id)
+        if self.state_store:
+            self.state_store.add_channel(ctx.channel.id)
         await ctx.send("I'll now respond to messages in this channel!")
     
     @commands.command(name='disable')
@@ -163,13 +544,15 @@ Use the context above to provide a personalized response.
     async def disable_channel(self, ctx):
         """Disable bot responses in current channel"""
         self.response_channels.discard(ctx.channel.id)
+        if self.state_store:
+            self.state_store.remove_channel(ctx.channel.id)
         await ctx.send("I'll stop responding to messages in this channel.")
     
     @commands.command(name='memory')
     async def memory_stats(self, ctx):
         """Show memory statistics for the user"""
         user_id = f"discord_{ctx.author.id}"
-        stats = memory_rag_system.get_conversation_stats(user_id)
+        stats = get_user_stats(user_id)
         
         embed = discord.Embed(
             title="Memory Statistics",
@@ -231,7 +614,8 @@ Use the context above to provide a personalized response.
                 'set_at': datetime.utcnow().isoformat()
             }
             memory_rag_system.update_user_profile(user_id, context_data)
-            await ctx.send(f"Personality preference set: {personality_trait}")
+            self.context_provider.invalidate(user_id)
+            await self.send_chunked(ctx, f"Personality preference set: {personality_trait}")
     
     @commands.command(name='status')
     async def bot_status(self, ctx):
@@ -253,12 +637,14 @@ Use the context above to provide a personalized response.
         )
         embed.add_field(
             name="AI Model",
-            value="Gemini 2.5 Flash" if self.ai_model else "Offline",
+            value="Gemini 2.5 Flash" if self.gemini_ready else "Offline",
             inline=True
         )
         
         # Get overall stats
-        total_stats = memory_rag_system.get_conversation_stats()
+        total_stats = self.global_stats
+        if total_stats is None:
+            total_stats = memory_rag_system.get_conversation_stats()
         embed.add_field(
             name="Total Conversations",
             value=total_stats.get('total_conversations', 0),
@@ -302,6 +688,21 @@ class DiscordManager:
         self.bot = None
         self.is_running = False
         self.token = os.getenv('DISCORD_BOT_TOKEN')
+        self.loop = None  # Long-lived event loop all bot work runs on
+        self.loop_thread = None
+        self.bot_future = None
+    
+    def get_loop(self) -> asyncio.AbstractEventLoop:
+        """Get the bot event loop, starting it in its own thread on first use"""
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+            self.loop_thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+            self.loop_thread.start()
+        return self.loop
+    
+    def run_coroutine(self, coro):
+        """Schedule a coroutine on the bot loop from any thread, returns a concurrent future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.get_loop())
     
     def start_bot(self):
         """Start Discord bot"""
@@ -312,29 +713,36 @@ class DiscordManager:
         try:
             self.bot = ZWaifDiscordBot()
             
-            # Run bot in background
-            import threading
-            
-            def run_bot():
-                asyncio.set_event_loop(asyncio.new_event_loop())
-                loop = asyncio.get_event_loop()
-                loop.run_until_complete(self.bot.start(self.token))
-            
-            bot_thread = threading.Thread(target=run_bot, daemon=True)
-            bot_thread.start()
-            
+            # Run bot in background on the shared loop, marked running first so a fast
+            # failure's callback isn't overwritten
             self.is_running = True
+            self.bot_future = self.run_coroutine(self.bot.start(self.token))
+            self.bot_future.add_done_callback(self._on_bot_exit)
+            
             print("Discord bot started in background")
             return True
             
         except Exception as e:
+            self.is_running = False
             print(f"Error starting Discord bot: {e}")
             return False
     
+    def _on_bot_exit(self, future):
+        """Log why the bot stopped (bad token, login failure, gateway crash) and mark it stopped"""
+        self.is_running = False
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            print(f"Discord bot stopped with an error: {error}")
+    
     def stop_bot(self):
         """Stop Discord bot"""
         if self.bot:
-            asyncio.create_task(self.bot.close())
+            try:
+                self.run_coroutine(self.bot.close()).result(timeout=5)
+            except Exception as e:
+                print(f"Error stopping Discord bot: {e}")
             self.is_running = False
             print("Discord bot stopped")
     
@@ -1,19 +1,17 @@
 import sys
-import time
 
 import colorama
-import humanize, os, threading
+import humanize, os
 import emoji
 import asyncio
+import re
+import concurrent.futures
 
 import utils.audio
 import utils.hotkeys
 import utils.transcriber_translate
 import utils.voice
-import utils.vtube_studio
 import utils.alarm
-import utils.volume_listener
-import utils.minecraft
 import utils.log_conversion
 import utils.cane_lib
 
@@ -24,20 +22,42 @@ import API.task_profiles
 import utils.lorebook
 import utils.camera
 
-import utils.z_waif_discord
-import utils.web_ui
-
+# Optional subsystems (VTube Studio, web UI, Minecraft, gaming) are imported where they
+# are used, behind their settings flags, so disabled ones never load their dependencies
 import utils.settings
 import utils.retrospect
 import utils.based_rag
 import utils.tag_task_controller
-import utils.gaming_control
-import utils.hangout
 
 import utils.uni_pipes
 import utils.zw_logging
 
 from dotenv import load_dotenv
+
+
+def _build_emoji_re():
+    """Compile one character class over every non-ASCII-symbol codepoint used by emoji"""
+    # Skip digits, '#', '*' and other low codepoints that only appear inside keycap sequences
+    codepoints = sorted({ord(c) for e in emoji.EMOJI_DATA for c in e if ord(c) > 0x2000})
+    ranges = []
+    start = prev = codepoints[0]
+    for cp in codepoints[1:]:
+        if cp != prev + 1:
+            ranges.append((start, prev))
+            start = cp
+        prev = cp
+    ranges.append((start, prev))
+    return re.compile("[" + "".join(f"\\U{a:08x}-\\U{b:08x}" for a, b in ranges) + "]+")
+
+
+EMOJI_RE = _build_emoji_re()
+
+# Botside killwords, matched case-insensitively without lowercasing the whole message
+KILL_RE = re.compile(r"/ripout/", re.IGNORECASE)
+
+# Long-lived workers for per-response side effects instead of a new thread each time
+VOICE_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="voice")
+SIDE_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="side")
 load_dotenv()
 
 TT_CHOICE = os.environ.get("WHISPER_CHOICE")
@@ -70,6 +90,7 @@ def main():
 
         # Stative control depending on what mode we are (gaming, streaming, normal, ect.)
         if utils.settings.is_gaming_loop:
+            import utils.gaming_control
             command = utils.gaming_control.gaming_step()
         else:
             command = utils.hotkeys.chat_input_await()
@@ -103,9 +124,7 @@ def main():
             utils.uni_pipes.start_new_pipe(desired_process="Hangout-Loop", is_main_pipe=True)
 
         # Wait until the main pipe we have sent is finished
-        while utils.uni_pipes.main_pipe_running:
-            # Sleep the loop while our main pipe still running
-            time.sleep(0.001)
+        utils.uni_pipes.main_pipe_done.wait()
 
         # Stack wipe any current inputs, to avoid doing multiple in a row
         utils.hotkeys.stack_wipe_inputs()
@@ -121,10 +140,11 @@ def main():
 def initialize_systems():
     """Initialize all Z-Waif systems"""
     print(f"{colorama.Fore.YELLOW}Initializing Gemini API...{colorama.Fore.RESET}")
-    API.gemini_controller.initialize()
+    API.gemini_controller.ensure_initialized()
     
     print(f"{colorama.Fore.YELLOW}Loading character card...{colorama.Fore.RESET}")
-    API.character_card.load_character_card()
+    API.character_card.ensure_loaded()
+    API.task_profiles.ensure_loaded()
     
     print(f"{colorama.Fore.YELLOW}Initializing audio systems...{colorama.Fore.RESET}")
     utils.audio.initialize()
@@ -137,10 +157,12 @@ def initialize_systems():
     
     if utils.settings.vtube_enabled:
         print(f"{colorama.Fore.YELLOW}Connecting to VTube Studio...{colorama.Fore.RESET}")
+        import utils.vtube_studio
         utils.vtube_studio.initialize()
     
     if utils.settings.web_ui_enabled:
         print(f"{colorama.Fore.YELLOW}Starting Web UI...{colorama.Fore.RESET}")
+        import utils.web_ui
         utils.web_ui.start_ui()
     
     print(f"{colorama.Fore.YELLOW}Initializing RAG memory...{colorama.Fore.RESET}")
@@ -154,11 +176,11 @@ def main_converse():
         end="", flush=True)
 
     # Actual recording and waiting bit
-    audio_buffer = utils.audio.record()
+    audio_buffer = utils.audio.record_to_buffer()
 
     size_string = ""
     try:
-        size_string = humanize.naturalsize(os.path.getsize(audio_buffer))
+        size_string = humanize.naturalsize(len(audio_buffer))
     except:
         size_string = str(1 + len(utils.transcriber_translate.transcription_chunks)) + " Chunks"
 
@@ -167,8 +189,7 @@ def main_converse():
 
         print(transcribing_log, end="", flush=True)
 
-        while utils.transcriber_translate.chunky_request != None:  # rest to wait for transcription to complete
-            time.sleep(0.01)
+        utils.transcriber_translate.wait_for_chunked_transcription()  # rest to wait for transcription to complete
 
         # My own edit- To remove possible transcribing errors
         transcript = "Whoops! The code is having some issues, chill for a second."
@@ -213,12 +234,6 @@ def main_converse():
     # Pipe us to the reply function
     main_message_speak()
 
-    # After use, delete the recording.
-    try:
-        os.remove(audio_buffer)
-    except:
-        pass
-
 
 def main_message_speak():
     """Handle speaking the AI's response"""
@@ -233,19 +248,14 @@ def main_message_speak():
         return
 
     # Speak the message now!
-    s_message = emoji.replace_emoji(message, replace='')
+    s_message = message if message.isascii() else EMOJI_RE.sub('', message)
 
     utils.voice.set_speaking(True)
 
-    voice_speaker = threading.Thread(target=utils.voice.speak_line, args=(s_message, False))
-    voice_speaker.daemon = True
-    voice_speaker.start()
-
-    # Minirest for frame-piercing (race condition as most people call it) for the speaking
-    time.sleep(0.01)
+    VOICE_POOL.submit(utils.voice.speak_line, s_message, False)
 
-    while utils.voice.check_if_speaking():
-        time.sleep(0.01)
+    # set_speaking(True) above already cleared the event, so this can't pass before speech starts
+    utils.voice.speaking_done.wait()
 
 
 def message_checks(message):
@@ -262,23 +272,24 @@ def message_checks(message):
     # Vtube Studio Emoting
     if utils.settings.vtube_enabled and not API.gemini_controller.last_message_streamed:
         # Feeds the message to our VTube Studio script
+        import utils.vtube_studio
         utils.vtube_studio.set_emote_string(message)
 
         # Check for any emotes on it's end
-        vtube_studio_thread = threading.Thread(target=utils.vtube_studio.check_emote_string)
-        vtube_studio_thread.daemon = True
-        vtube_studio_thread.start()
+        SIDE_POOL.submit(utils.vtube_studio.check_emote_string)
 
     # Minecraft API
     if utils.settings.minecraft_enabled:
+        import utils.minecraft
         utils.minecraft.check_for_command(message)
 
     # Gaming
     if utils.settings.gaming_enabled:
+        import utils.gaming_control
         utils.gaming_control.message_inputs(message)
 
     # Check if we need to close the program (botside killword)
-    if message.lower().__contains__("/ripout/"):
+    if KILL_RE.search(message):
         print("\n\nBot is knowingly closing the program! This is typically done as a last resort! Please re-evaluate your actions! :(\n\n")
         sys.exit("Closing...")
         exit()
@@ -314,6 +325,7 @@ def main_minecraft_chat(message):
     API.gemini_controller.send_message(message)
 
     # Reply in the craft
+    import utils.minecraft
     utils.minecraft.minecraft_chat()
 
     # Run our message checks
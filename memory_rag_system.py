@@ -9,115 +9,335 @@ from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import hashlib
 import re
-from models import ConversationLog, Memory, UserProfile, KnowledgeBase, create_session
+import threading
+import time
+from collections import Counter, deque
+from functools import lru_cache
+from models import ConversationLog, Memory, UserProfile, KnowledgeBase, session_scope
+from utils import vector_kernels
 import google.generativeai as genai
 
+# Patterns compiled once at import instead of on every call
+_TOKEN_RE = re.compile(r'[^\w\s]')
+_PREF_RES = [re.compile(p) for p in (
+    r"i (love|like|enjoy|prefer|hate|dislike) (.+)",
+    r"my favorite (.+) is (.+)",
+    r"i'm (into|interested in) (.+)"
+)]
+_FACT_RES = [re.compile(p) for p in (
+    r"i am (.+)",
+    r"i work (.+)",
+    r"i live (.+)",
+    r"my name is (.+)"
+)]
+# Matches wherever any single pattern above would, so most messages need just this one scan
+_MEMORY_CUE_RE = re.compile('|'.join(f'(?:{p.pattern})' for p in _PREF_RES + _FACT_RES))
+
+# Topic and sentiment keywords, matched as substrings of the lowercased message
+_TOPIC_KEYWORDS = {
+    'technology': frozenset(['tech', 'computer', 'ai', 'programming', 'code', 'software']),
+    'gaming': frozenset(['game', 'play', 'gaming', 'stream', 'twitch']),
+    'music': frozenset(['music', 'song', 'sing', 'dance', 'melody']),
+    'art': frozenset(['art', 'draw', 'paint', 'creative', 'design']),
+    'personal': frozenset(['feel', 'think', 'like', 'love', 'hate', 'prefer'])
+}
+_POSITIVE_WORDS = frozenset(['good', 'great', 'awesome', 'love', 'like', 'happy', 'amazing'])
+_NEGATIVE_WORDS = frozenset(['bad', 'hate', 'sad', 'angry', 'terrible', 'awful', 'frustrated'])
+
+# One pass finds every keyword occurrence; the lookahead lets matches overlap
+# (no keyword is a prefix of another, so each position yields the only candidate)
+_KEYWORD_RE = re.compile('(?=(' + '|'.join(sorted(map(re.escape, set().union(
+    _POSITIVE_WORDS, _NEGATIVE_WORDS, *_TOPIC_KEYWORDS.values())))) + '))')
+
 class SimpleEmbedding:
     """Simple text embedding for semantic similarity without external dependencies"""
     
     def __init__(self):
         self.vocab = {}
         self.idf_scores = {}
+        self.idf_vector = np.empty(0, dtype=np.float32)
+        # Memoized embeddings for repeated query text, cleared whenever the vocabulary changes
+        self.embed_query = lru_cache(maxsize=1024)(self._embed_query)
     
     def _tokenize(self, text: str) -> List[str]:
         """Basic tokenization"""
-        text = re.sub(r'[^\w\s]', '', text.lower())
-        return text.split()
+        return _TOKEN_RE.sub('', text.lower()).split()
     
     def _build_vocab(self, texts: List[str]):
         """Build vocabulary from texts"""
-        word_counts = {}
-        doc_counts = {}
+        word_counts = Counter()
+        doc_counts = Counter()
         
         for text in texts:
             tokens = self._tokenize(text)
-            unique_tokens = set(tokens)
-            
-            for token in tokens:
-                word_counts[token] = word_counts.get(token, 0) + 1
-            
-            for token in unique_tokens:
-                doc_counts[token] = doc_counts.get(token, 0) + 1
+            word_counts.update(tokens)
+            doc_counts.update(set(tokens))
         
-        # Calculate IDF scores
-        total_docs = len(texts)
-        for word, doc_count in doc_counts.items():
-            self.idf_scores[word] = np.log(total_docs / (1 + doc_count))
+        self.vocab = {word: idx for idx, word in enumerate(word_counts)}
         
-        self.vocab = {word: idx for idx, word in enumerate(word_counts.keys())}
+        # Calculate IDF scores in one vectorized pass, aligned with vocab indices
+        doc_freq = np.fromiter((doc_counts[word] for word in self.vocab), dtype=np.float64, count=len(self.vocab))
+        idf = np.log(len(texts) / (1 + doc_freq))
+        self.idf_scores = dict(zip(self.vocab, idf.tolist()))
+        self.idf_vector = idf.astype(np.float32)
+        self.embed_query.cache_clear()
     
-    def embed_text(self, text: str, vocab_size: int = 100) -> List[float]:
+    def embed_texts(self, texts: List[str], vocab_size: int = 100) -> np.ndarray:
+        """Create an (N, D) matrix of embeddings for several texts in one pass"""
+        dim = min(vocab_size, len(self.vocab))
+        token_lists = [self._tokenize(text) for text in texts]
+        lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.intp, count=len(texts))
+        total = int(lengths.sum())
+        
+        # Flatten every token into one (row, vocab index) stream; unknown tokens fall past dim
+        lookup = self.vocab.get
+        unknown = len(self.vocab)
+        columns = np.fromiter((lookup(token, unknown) for tokens in token_lists for token in tokens),
+                              dtype=np.intp, count=total)
+        rows = np.repeat(np.arange(len(texts)), lengths)
+        keep = columns < dim
+        
+        # Create TF-IDF matrix
+        counts = np.bincount(rows[keep] * dim + columns[keep], minlength=len(texts) * dim)
+        matrix = counts.reshape(len(texts), dim).astype(np.float32)
+        matrix *= self.idf_vector[:dim]
+        matrix /= np.maximum(lengths, 1)[:, None]
+        
+        # Normalize rows
+        norms = np.linalg.norm(matrix, axis=1)
+        norms[norms == 0] = 1.0
+        matrix /= norms[:, None]
+        
+        return matrix
+    
+    def embed_text(self, text: str, vocab_size: int = 100) -> np.ndarray:
         """Create embedding vector for text"""
         tokens = self._tokenize(text)
+        dim = min(vocab_size, len(self.vocab))
+        if not tokens:
+            return np.zeros(dim, dtype=np.float32)
         
-        # Create TF-IDF vector
-        vector = [0.0] * min(vocab_size, len(self.vocab))
-        token_counts = {}
-        
-        for token in tokens:
-            token_counts[token] = token_counts.get(token, 0) + 1
+        # Map tokens to vocab indices; unknown tokens land in an overflow bin
+        lookup = self.vocab.get
+        unknown = len(self.vocab)
+        indices = np.fromiter((lookup(token, unknown) for token in tokens), dtype=np.intp, count=len(tokens))
         
-        for token, count in token_counts.items():
-            if token in self.vocab:
-                idx = self.vocab[token]
-                if idx < len(vector):
-                    tf = count / len(tokens)
-                    idf = self.idf_scores.get(token, 1.0)
-                    vector[idx] = tf * idf
+        # Create TF-IDF vector
+        counts = np.bincount(indices, minlength=dim)[:dim]
+        vector = counts.astype(np.float32) * (self.idf_vector[:dim] / len(tokens))
         
         # Normalize vector
         norm = np.linalg.norm(vector)
         if norm > 0:
-            vector = [x / norm for x in vector]
+            vector /= norm
         
         return vector
     
-    def cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calculate cosine similarity between vectors"""
-        if len(vec1) != len(vec2):
+    def _embed_query(self, text: str) -> np.ndarray:
+        """Read-only embedding, safe to share between callers of the cache"""
+        vector = self.embed_text(text)
+        vector.setflags(write=False)
+        return vector
+    
+    def cosine_similarity(self, vec1, vec2, normalized: bool = False) -> float:
+        """Calculate cosine similarity between vectors; pass normalized=True for embed_text output"""
+        a = np.asarray(vec1, dtype=np.float32)
+        b = np.asarray(vec2, dtype=np.float32)
+        if a.shape != b.shape:
             return 0.0
         
-        dot_product = sum(a * b for a, b in zip(vec1, vec2))
-        norm1 = np.sqrt(sum(a * a for a in vec1))
-        norm2 = np.sqrt(sum(b * b for b in vec2))
-        
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
+        if normalized:
+            # embed_text always returns unit-length (or all-zero) vectors
+            return vector_kernels.normalized_dot(a, b)
+        return vector_kernels.cosine(a, b)
+    
+    def quantized_scores(self, query_vec: np.ndarray, matrix: np.ndarray, scales: np.ndarray) -> np.ndarray:
+        """Similarity of a normalized query against an (N, D) int8 matrix with per-row scales"""
+        q8, q_scale = _quantize_embedding(query_vec)
+        return vector_kernels.int8_similarities(matrix, scales, q8, q_scale)
+
+def _quantize_embedding(vector) -> Tuple[np.ndarray, float]:
+    """Symmetric int8 quantization of an embedding, returning the codes and scale"""
+    vec = np.asarray(vector, dtype=np.float32)
+    peak = float(np.abs(vec).max()) if vec.size else 0.0
+    scale = peak / 127.0 if peak > 0 else 1.0
+    return np.round(vec / scale).astype(np.int8), scale
+
+def _decode_embedding(blob, scale: Optional[float]) -> Tuple[np.ndarray, float]:
+    """Read a stored embedding as int8 codes plus scale"""
+    if scale is not None:
+        return np.frombuffer(blob, dtype=np.int8), scale
+    # Legacy rows hold float32 bytes or a JSON list, as text or as bytes after the bytea migration
+    if isinstance(blob, str):
+        return _quantize_embedding(json.loads(blob))
+    data = bytes(blob)
+    if data[:1] == b'[' and data[-1:] == b']':
+        try:
+            return _quantize_embedding(json.loads(data))
+        except ValueError:
+            pass  # float32 bytes that happen to start and end with brackets
+    return _quantize_embedding(np.frombuffer(blob, dtype=np.float32))
+
+def _stack_embeddings(rows, dim: int) -> Tuple[list, np.ndarray, np.ndarray]:
+    """Parse stored embeddings into a contiguous (N, D) int8 matrix and scales, skipping bad rows"""
+    kept = []
+    vectors = []
+    scales = []
+    for row in rows:
+        if not row.embedding_vector:
+            continue
+        try:
+            vec, scale = _decode_embedding(row.embedding_vector, row.embedding_scale)
+        except (ValueError, TypeError):
+            continue
+        if vec.shape != (dim,):
+            continue
+        kept.append(row)
+        vectors.append(vec)
+        scales.append(scale)
+    
+    if not vectors:
+        return kept, np.empty((0, dim), dtype=np.int8), np.empty(0, dtype=np.float32)
+    return kept, np.vstack(vectors), np.array(scales, dtype=np.float32)
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first"""
+    if k <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.intp)
+    if scores.size > k:
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(scores.size)
+    return idx[np.argsort(-scores[idx], kind='stable')]
+
+class _CacheTable:
+    """Struct-of-arrays cache of quantized embeddings, scanned without a database round-trip"""
+    
+    _COLUMNS = ('ids', 'emb', 'scales', 'weights', 'records')
+    
+    def __init__(self, dim: int, capacity: int = 256):
+        self.dim = dim
+        self.size = 0
+        self.ids = np.empty(capacity, dtype=np.int64)
+        self.emb = np.empty((capacity, dim), dtype=np.int8)
+        self.scales = np.empty(capacity, dtype=np.float32)
+        self.weights = np.empty(capacity, dtype=np.float32)  # Importance for memories
+        self.records = np.empty(capacity, dtype=object)  # Detached rows, when kept in memory
+        self._rows_by_user = {}  # user_id -> row positions, oldest first
+        self._lock = threading.Lock()
+    
+    def _reserve(self, extra: int):
+        """Grow every column by doubling until `extra` more rows fit"""
+        needed = self.size + extra
+        if needed <= len(self.ids):
+            return
+        capacity = max(needed, 2 * len(self.ids))
+        for name in self._COLUMNS:
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+    
+    def extend(self, ids, user_ids, matrix: np.ndarray, scales, weights=None, records=None):
+        """Append rows in order; rows must be oldest first"""
+        count = len(ids)
+        if count == 0 or matrix.shape[1] != self.dim:
+            return
+        with self._lock:
+            self._reserve(count)
+            start, end = self.size, self.size + count
+            self.ids[start:end] = ids
+            self.emb[start:end] = matrix
+            self.scales[start:end] = scales
+            self.weights[start:end] = 0.0 if weights is None else weights
+            for position, record in enumerate(records or (), start):
+                self.records[position] = record
+            for position, user_id in enumerate(user_ids, start):
+                self._rows_by_user.setdefault(user_id, []).append(position)
+            self.size = end
+    
+    def append(self, row_id: int, user_id: str, codes: np.ndarray, scale: float,
+               weight: float = 0.0, record=None):
+        """Append a single row"""
+        if codes.shape == (self.dim,):
+            self.extend([row_id], [user_id], codes.reshape(1, -1), [scale], [weight],
+                        None if record is None else [record])
+    
+    def select(self, user_id: Optional[str], limit: int, by_weight: bool = False):
+        """(ids, matrix, scales, weights, records) of a user's newest rows, or highest-weight rows if by_weight"""
+        with self._lock:
+            size = self.size
+            ids, emb, scales, weights, records = (getattr(self, name) for name in self._COLUMNS)
+            if user_id:
+                positions = np.array(self._rows_by_user.get(user_id, ()), dtype=np.intp)
+            else:
+                positions = np.arange(size)
         
-        return dot_product / (norm1 * norm2)
+        if by_weight:
+            positions = positions[np.argsort(-weights[positions], kind='stable')[:limit]]
+        else:
+            positions = positions[::-1][:limit]
+        return ids[positions], emb[positions], scales[positions], weights[positions], records[positions]
 
 class MemoryRAGSystem:
     """Advanced Memory and RAG system"""
     
     def __init__(self):
         self.embedding_model = SimpleEmbedding()
-        self.conversation_cache = []
-        self.memory_cache = []
+        # In-memory embedding tables; None until loaded, in which case searches query the database
+        self.conversation_table = None
+        self.memory_table = None
         self.similarity_threshold = 0.3
         self.max_context_length = 8000
+        # Recent (user_id, query embedding, context) entries for near-duplicate queries
+        self.context_cache = deque(maxlen=256)
+        self.context_cache_threshold = 0.95
+        self._context_cache_lock = threading.Lock()
+        # Memory ids whose access counts still need writing, flushed in batches by a background thread
+        self._pending_access = deque()
+        self._access_event = threading.Event()
+        self._access_writer = None
+        self._access_writer_lock = threading.Lock()
+        self.access_flush_interval = 2.0
         self.initialize_system()
     
     def initialize_system(self):
         """Initialize the memory and RAG system"""
         try:
             # Load existing conversations to build embedding vocabulary
-            session = create_session()
-            conversations = session.query(ConversationLog).limit(1000).all()
-            
-            if conversations:
-                texts = []
-                for conv in conversations:
-                    texts.append(conv.user_message)
-                    texts.append(conv.ai_response)
+            with session_scope() as session:
+                conversations = session.query(
+                    ConversationLog.user_message, ConversationLog.ai_response
+                ).limit(1000).all()
                 
-                self.embedding_model._build_vocab(texts)
-                self.conversation_cache = conversations[-50:]  # Keep recent conversations
-            
-            # Load memories
-            memories = session.query(Memory).limit(500).all()
-            self.memory_cache = memories
-            
-            session.close()
+                if conversations:
+                    texts = []
+                    for conv in conversations:
+                        texts.append(conv.user_message)
+                        texts.append(conv.ai_response)
+                    
+                    self.embedding_model._build_vocab(texts)
+                
+                # Load every stored embedding into the in-memory tables, oldest first
+                dim = self.embedding_model.embed_text("").size
+                rows = session.query(
+                    ConversationLog.id, ConversationLog.user_id,
+                    ConversationLog.embedding_vector, ConversationLog.embedding_scale
+                ).order_by(ConversationLog.created_at, ConversationLog.id).all()
+                rows, matrix, scales = _stack_embeddings(rows, dim)
+                conversation_table = _CacheTable(dim, max(len(rows), 256))
+                conversation_table.extend([r.id for r in rows], [r.user_id for r in rows], matrix, scales)
+                
+                # Memories are small, so keep the rows themselves and serve reads from RAM
+                rows = session.query(Memory).order_by(Memory.created_at, Memory.id).all()
+                rows, matrix, scales = _stack_embeddings(rows, dim)
+                memory_table = _CacheTable(dim, max(len(rows), 256))
+                memory_table.extend([r.id for r in rows], [r.user_id for r in rows], matrix, scales,
+                                    [r.importance_score or 0.0 for r in rows], rows)
+            
+            self.conversation_table = conversation_table
+            self.memory_table = memory_table
+            vector_kernels.warm_up()
             print("Memory and RAG system initialized")
             
         except Exception as e:
@@ -127,38 +347,42 @@ class MemoryRAGSystem:
                           platform: str = 'web', session_id: str = None) -> int:
         """Store conversation with embedding"""
         try:
-            session = create_session()
-            
-            # Create embedding for user message
-            embedding = self.embedding_model.embed_text(user_message + " " + ai_response)
-            embedding_str = json.dumps(embedding)
+            # Embed the exchange and any extracted memories together
+            memories_to_store = self._extract_memories(user_message)
+            embeddings = self.embedding_model.embed_texts(
+                [user_message + " " + ai_response] + [m['content'] for m in memories_to_store])
             
-            # Extract context data
-            context_data = self._extract_context(user_message, ai_response)
-            
-            conversation = ConversationLog(
-                user_id=user_id,
-                user_message=user_message,
-                ai_response=ai_response,
-                platform=platform,
-                context_data=context_data,
-                embedding_vector=embedding_str,
-                session_id=session_id
-            )
-            
-            session.add(conversation)
-            session.commit()
-            
-            conv_id = conversation.id
-            session.close()
+            with session_scope() as session:
+                embedding_codes, embedding_scale = _quantize_embedding(embeddings[0])
+                
+                # Extract context data
+                context_data = self._extract_context(user_message, ai_response)
+                
+                conversation = ConversationLog(
+                    user_id=user_id,
+                    user_message=user_message,
+                    ai_response=ai_response,
+                    platform=platform,
+                    context_data=context_data,
+                    embedding_vector=embedding_codes.tobytes(),
+                    embedding_scale=embedding_scale,
+                    session_id=session_id
+                )
+                
+                session.add(conversation)
+                session.commit()
+                
+                conv_id = conversation.id
             
             # Update cache
-            self.conversation_cache.append(conversation)
-            if len(self.conversation_cache) > 50:
-                self.conversation_cache = self.conversation_cache[-50:]
+            if self.conversation_table is not None:
+                self.conversation_table.append(conv_id, user_id, embedding_codes, embedding_scale)
+            
+            # Store extracted memories
+            self._store_memories(user_id, memories_to_store, embeddings[1:], conv_id)
             
-            # Extract and store memories
-            self._extract_and_store_memories(user_id, user_message, ai_response, conv_id)
+            # New conversation data can change this user's context
+            self.invalidate_context_cache(user_id)
             
             return conv_id
             
@@ -175,31 +399,16 @@ class MemoryRAGSystem:
             'entities': []
         }
         
-        # Simple topic extraction
-        topics = []
-        message_lower = user_message.lower()
-        
-        # Topic keywords
-        topic_keywords = {
-            'technology': ['tech', 'computer', 'ai', 'programming', 'code', 'software'],
-            'gaming': ['game', 'play', 'gaming', 'stream', 'twitch'],
-            'music': ['music', 'song', 'sing', 'dance', 'melody'],
-            'art': ['art', 'draw', 'paint', 'creative', 'design'],
-            'personal': ['feel', 'think', 'like', 'love', 'hate', 'prefer']
-        }
-        
-        for topic, keywords in topic_keywords.items():
-            if any(keyword in message_lower for keyword in keywords):
-                topics.append(topic)
+        # Collect every keyword present in one scan of the message
+        found = set(_KEYWORD_RE.findall(user_message.lower()))
         
-        context['topics'] = topics
+        # Simple topic extraction
+        context['topics'] = [topic for topic, keywords in _TOPIC_KEYWORDS.items()
+                             if not keywords.isdisjoint(found)]
         
         # Simple sentiment analysis
-        positive_words = ['good', 'great', 'awesome', 'love', 'like', 'happy', 'amazing']
-        negative_words = ['bad', 'hate', 'sad', 'angry', 'terrible', 'awful', 'frustrated']
-        
-        positive_count = sum(1 for word in positive_words if word in message_lower)
-        negative_count = sum(1 for word in negative_words if word in message_lower)
+        positive_count = len(found & _POSITIVE_WORDS)
+        negative_count = len(found & _NEGATIVE_WORDS)
         
         if positive_count > negative_count:
             context['sentiment'] = 'positive'
@@ -208,181 +417,303 @@ class MemoryRAGSystem:
         
         return context
     
-    def _extract_and_store_memories(self, user_id: str, user_message: str, 
-                                   ai_response: str, conversation_id: int):
-        """Extract and store important memories from conversation"""
-        try:
-            # Simple memory extraction based on patterns
-            memories_to_store = []
-            message_lower = user_message.lower()
-            
-            # Extract preferences
-            preference_patterns = [
-                r"i (love|like|enjoy|prefer|hate|dislike) (.+)",
-                r"my favorite (.+) is (.+)",
-                r"i'm (into|interested in) (.+)"
-            ]
-            
-            for pattern in preference_patterns:
-                matches = re.findall(pattern, message_lower)
-                for match in matches:
-                    if len(match) == 2:
-                        sentiment = match[0]
-                        subject = match[1].strip()
-                        
-                        memory_content = f"User {sentiment} {subject}"
-                        memories_to_store.append({
-                            'type': 'preference',
-                            'content': memory_content,
-                            'importance': 0.8 if sentiment in ['love', 'like', 'enjoy'] else 0.6
-                        })
-            
-            # Extract facts about user
-            fact_patterns = [
-                r"i am (.+)",
-                r"i work (.+)",
-                r"i live (.+)",
-                r"my name is (.+)"
-            ]
-            
-            for pattern in fact_patterns:
-                matches = re.findall(pattern, message_lower)
-                for match in matches:
-                    memory_content = f"User is/has {match.strip()}"
+    def _extract_memories(self, user_message: str) -> List[Dict[str, Any]]:
+        """Extract important memories from a user message"""
+        # Simple memory extraction based on patterns
+        memories_to_store = []
+        message_lower = user_message.lower()
+        if not _MEMORY_CUE_RE.search(message_lower):
+            return memories_to_store
+        
+        # Extract preferences
+        for pattern in _PREF_RES:
+            for match in pattern.findall(message_lower):
+                if len(match) == 2:
+                    sentiment = match[0]
+                    subject = match[1].strip()
+                    
+                    memory_content = f"User {sentiment} {subject}"
                     memories_to_store.append({
-                        'type': 'fact',
+                        'type': 'preference',
                         'content': memory_content,
-                        'importance': 0.9
+                        'importance': 0.8 if sentiment in ['love', 'like', 'enjoy'] else 0.6
                     })
+        
+        # Extract facts about user
+        for pattern in _FACT_RES:
+            for match in pattern.findall(message_lower):
+                memory_content = f"User is/has {match.strip()}"
+                memories_to_store.append({
+                    'type': 'fact',
+                    'content': memory_content,
+                    'importance': 0.9
+                })
+        
+        return memories_to_store
+    
+    def _store_memories(self, user_id: str, memories_to_store: List[Dict[str, Any]],
+                        embeddings: np.ndarray, conversation_id: int):
+        """Store extracted memories with their precomputed embeddings"""
+        try:
+            if not memories_to_store:
+                return
             
-            # Store memories in database
-            session = create_session()
-            
-            for memory_data in memories_to_store:
-                embedding = self.embedding_model.embed_text(memory_data['content'])
+            memories = []
+            for memory_data, embedding in zip(memories_to_store, embeddings):
+                embedding_codes, embedding_scale = _quantize_embedding(embedding)
                 
-                memory = Memory(
+                memories.append(Memory(
                     user_id=user_id,
                     memory_type=memory_data['type'],
                     content=memory_data['content'],
                     importance_score=memory_data['importance'],
                     confidence_score=0.8,
-                    embedding_vector=json.dumps(embedding),
+                    embedding_vector=embedding_codes.tobytes(),
+                    embedding_scale=embedding_scale,
                     conversation_id=conversation_id
-                )
-                
-                session.add(memory)
-                self.memory_cache.append(memory)
+                ))
+            
+            # Store memories in database with one batched INSERT
+            with session_scope() as session:
+                session.bulk_save_objects(memories, return_defaults=True)
             
-            session.commit()
-            session.close()
+            if self.memory_table is not None:
+                for memory in memories:
+                    self.memory_table.append(memory.id, user_id, np.frombuffer(memory.embedding_vector, dtype=np.int8),
+                                             memory.embedding_scale, memory.importance_score, memory)
             
         except Exception as e:
-            print(f"Error extracting memories: {e}")
+            print(f"Error storing memories: {e}")
     
     def search_similar_conversations(self, query: str, user_id: str = None, 
-                                   max_results: int = 5) -> List[Dict[str, Any]]:
+                                   max_results: int = 5, query_embedding: np.ndarray = None) -> List[Dict[str, Any]]:
         """Search for similar conversations using semantic similarity"""
         try:
-            query_embedding = self.embedding_model.embed_text(query)
+            if query_embedding is None:
+                query_embedding = self.embedding_model.embed_query(query)
             results = []
             
-            session = create_session()
-            conversations = session.query(ConversationLog)
-            
-            if user_id:
-                conversations = conversations.filter(ConversationLog.user_id == user_id)
-            
-            conversations = conversations.order_by(ConversationLog.created_at.desc()).limit(100).all()
-            
-            for conv in conversations:
-                if conv.embedding_vector:
-                    try:
-                        conv_embedding = json.loads(conv.embedding_vector)
-                        similarity = self.embedding_model.cosine_similarity(query_embedding, conv_embedding)
-                        
-                        if similarity > self.similarity_threshold:
-                            results.append({
-                                'conversation': conv,
-                                'similarity': similarity,
-                                'user_message': conv.user_message,
-                                'ai_response': conv.ai_response,
-                                'created_at': conv.created_at
-                            })
-                    except:
+            with session_scope() as session:
+                ids, matrix, scales = self._conversation_candidates(session, user_id, query_embedding.size)
+                
+                # Score every candidate with one matrix-vector product
+                scores = self.embedding_model.quantized_scores(query_embedding, matrix, scales)
+                candidates = np.flatnonzero(scores > self.similarity_threshold)
+                top = candidates[_top_k(scores[candidates], max_results)]
+                if top.size == 0:
+                    return results
+                
+                # Full rows are loaded only for the winners
+                rows = session.query(ConversationLog).filter(
+                    ConversationLog.id.in_(ids[top].tolist())
+                ).all()
+                rows_by_id = {row.id: row for row in rows}
+                
+                for i in top:
+                    conv = rows_by_id.get(int(ids[i]))
+                    if conv is None:
                         continue
-            
-            session.close()
-            
-            # Sort by similarity and return top results
-            results.sort(key=lambda x: x['similarity'], reverse=True)
-            return results[:max_results]
+                    results.append({
+                        'conversation': conv,
+                        'similarity': float(scores[i]),
+                        'user_message': conv.user_message,
+                        'ai_response': conv.ai_response,
+                        'created_at': conv.created_at
+                    })
+            return results
             
         except Exception as e:
             print(f"Error searching conversations: {e}")
             return []
     
-    def get_relevant_memories(self, query: str, user_id: str, max_results: int = 5) -> List[Dict[str, Any]]:
+    def _conversation_candidates(self, session, user_id: Optional[str], dim: int):
+        """(ids, int8 matrix, scales) of the 100 most recent conversations, newest first"""
+        if self.conversation_table is not None and self.conversation_table.dim == dim:
+            ids, matrix, scales, _, _ = self.conversation_table.select(user_id, 100)
+            return ids, matrix, scales
+        
+        # Scan only ids and embeddings
+        conversations = session.query(
+            ConversationLog.id, ConversationLog.embedding_vector, ConversationLog.embedding_scale
+        )
+        
+        if user_id:
+            conversations = conversations.filter(ConversationLog.user_id == user_id)
+        
+        conversations = conversations.order_by(ConversationLog.created_at.desc()).limit(100).all()
+        conversations, matrix, scales = _stack_embeddings(conversations, dim)
+        return np.array([c.id for c in conversations], dtype=np.int64), matrix, scales
+    
+    def _memory_candidates(self, user_id: str, dim: int):
+        """(ids, int8 matrix, scales, importance, rows) of a user's 50 most important memories"""
+        if self.memory_table is not None and self.memory_table.dim == dim:
+            return self.memory_table.select(user_id, 50, by_weight=True)
+        
+        # Scan only ids, scores and embeddings
+        with session_scope() as session:
+            memories = session.query(
+                Memory.id, Memory.importance_score, Memory.embedding_vector, Memory.embedding_scale
+            ).filter(
+                Memory.user_id == user_id
+            ).order_by(Memory.importance_score.desc()).limit(50).all()
+        memories, matrix, scales = _stack_embeddings(memories, dim)
+        return (np.array([m.id for m in memories], dtype=np.int64), matrix, scales,
+                np.array([m.importance_score or 0.0 for m in memories], dtype=np.float32), None)
+    
+    def get_relevant_memories(self, query: str, user_id: str, max_results: int = 5,
+                              query_embedding: np.ndarray = None) -> List[Dict[str, Any]]:
         """Get relevant memories for current context"""
         try:
-            query_embedding = self.embedding_model.embed_text(query)
+            if query_embedding is None:
+                query_embedding = self.embedding_model.embed_query(query)
             results = []
             
-            session = create_session()
-            memories = session.query(Memory).filter(
-                Memory.user_id == user_id
-            ).order_by(Memory.importance_score.desc()).limit(50).all()
-            
-            for memory in memories:
-                if memory.embedding_vector:
-                    try:
-                        memory_embedding = json.loads(memory.embedding_vector)
-                        similarity = self.embedding_model.cosine_similarity(query_embedding, memory_embedding)
-                        
-                        if similarity > self.similarity_threshold:
-                            # Update access count
-                            memory.access_count += 1
-                            memory.last_accessed = datetime.utcnow()
-                            
-                            results.append({
-                                'memory': memory,
-                                'similarity': similarity,
-                                'content': memory.content,
-                                'type': memory.memory_type,
-                                'importance': memory.importance_score
-                            })
-                    except:
-                        continue
-            
-            session.commit()
-            session.close()
-            
-            # Sort by combined score (similarity + importance)
-            for result in results:
-                result['combined_score'] = (result['similarity'] * 0.7 + 
-                                          result['importance'] * 0.3)
-            
-            results.sort(key=lambda x: x['combined_score'], reverse=True)
-            return results[:max_results]
+            ids, matrix, scales, importance, records = self._memory_candidates(user_id, query_embedding.size)
+            
+            # Score every candidate with one matrix-vector product
+            scores = self.embedding_model.quantized_scores(query_embedding, matrix, scales)
+            candidates = np.flatnonzero(scores > self.similarity_threshold)
+            if candidates.size == 0:
+                return results
+            
+            # Rank by combined score (similarity + importance)
+            combined = scores[candidates] * 0.7 + importance[candidates] * 0.3
+            top = _top_k(combined, max_results)
+            top_ids = ids[candidates[top]].tolist()
+            
+            if records is None:
+                # Full rows are loaded only for the winners
+                with session_scope() as session:
+                    rows = session.query(Memory).filter(Memory.id.in_(top_ids)).all()
+                rows_by_id = {row.id: row for row in rows}
+            else:
+                rows_by_id = dict(zip(top_ids, records[candidates[top]]))
+            
+            for memory_id, j in zip(top_ids, top):
+                memory = rows_by_id.get(memory_id)
+                if memory is None:
+                    continue
+                results.append({
+                    'memory': memory,
+                    'similarity': float(scores[candidates[j]]),
+                    'content': memory.content,
+                    'type': memory.memory_type,
+                    'importance': memory.importance_score,
+                    'combined_score': float(combined[j])
+                })
+            
+            self._record_memory_access([r['memory'].id for r in results])
+            return results
             
         except Exception as e:
             print(f"Error getting memories: {e}")
             return []
     
-    def build_context_for_response(self, user_message: str, user_id: str) -> str:
+    def _record_memory_access(self, memory_ids: List[int]):
+        """Queue access-count bumps for returned memories; written in batches off the read path"""
+        if not memory_ids:
+            return
+        
+        self._pending_access.extend(memory_ids)
+        if self._access_writer is None:
+            with self._access_writer_lock:
+                if self._access_writer is None:
+                    self._access_writer = threading.Thread(target=self._access_writer_loop, daemon=True)
+                    self._access_writer.start()
+        self._access_event.set()
+    
+    def _access_writer_loop(self):
+        """Background loop that coalesces queued access counts into a few UPDATEs"""
+        while True:
+            self._access_event.wait()
+            time.sleep(self.access_flush_interval)  # Let more reads pile up
+            self._access_event.clear()
+            self.flush_memory_access()
+    
+    def flush_memory_access(self):
+        """Write queued access counts, one UPDATE per distinct increment"""
+        memory_ids = []
+        while self._pending_access:
+            memory_ids.append(self._pending_access.popleft())
+        if not memory_ids:
+            return
+        
+        ids_by_increment = {}
+        for memory_id, count in Counter(memory_ids).items():
+            ids_by_increment.setdefault(count, []).append(memory_id)
+        
+        try:
+            now = datetime.utcnow()
+            with session_scope() as session:
+                for increment, group in ids_by_increment.items():
+                    session.query(Memory).filter(Memory.id.in_(group)).update({
+                        Memory.access_count: Memory.access_count + increment,
+                        Memory.last_accessed: now
+                    }, synchronize_session=False)
+        except Exception as e:
+            print(f"Error updating memory access counts: {e}")
+    
+    def _lookup_cached_context(self, user_id: str, query_embedding: np.ndarray) -> Optional[str]:
+        """Return a cached context for a near-identical query from the same user"""
+        with self._context_cache_lock:
+            entries = [(emb, ctx) for uid, emb, ctx in self.context_cache
+                       if uid == user_id and emb.shape == query_embedding.shape]
+        if not entries:
+            return None
+        
+        scores = np.vstack([emb for emb, _ in entries]) @ query_embedding
+        best = int(np.argmax(scores))
+        if scores[best] > self.context_cache_threshold:
+            return entries[best][1]
+        return None
+    
+    def invalidate_context_cache(self, user_id: str):
+        """Drop cached contexts for a user after their memories change"""
+        with self._context_cache_lock:
+            kept = [entry for entry in self.context_cache if entry[0] != user_id]
+            self.context_cache.clear()
+            self.context_cache.extend(kept)
+    
+    def build_context_for_response(self, user_message: str, user_id: str,
+                                   query_embedding: np.ndarray = None) -> str:
         """Build enriched context for AI response"""
+        if query_embedding is None:
+            query_embedding = self.embedding_model.embed_query(user_message)
+        cached = self._lookup_cached_context(user_id, query_embedding)
+        if cached is not None:
+            return cached
+        
+        full_context = self._build_context(user_message, user_id, query_embedding)
+        with self._context_cache_lock:
+            self.context_cache.append((user_id, query_embedding, full_context))
+        return full_context
+    
+    def _build_context(self, user_message: str, user_id: str, query_embedding: np.ndarray) -> str:
+        """Assemble profile, memories and similar conversations into a context block"""
         context_parts = []
         
+        # Get user profile first - it changes least between turns, so prompts share a longer prefix
+        try:
+            with session_scope() as session:
+                profile = session.query(UserProfile).filter(UserProfile.user_id == user_id).first()
+                if profile and profile.preferences:
+                    profile_context = f"User preferences: {json.dumps(profile.preferences, sort_keys=True)}\n"
+                    context_parts.append(profile_context)
+        except:
+            pass
+        
         # Get relevant memories
-        memories = self.get_relevant_memories(user_message, user_id, max_results=3)
+        memories = self.get_relevant_memories(user_message, user_id, max_results=3,
+                                              query_embedding=query_embedding)
         if memories:
             memory_context = "Relevant memories about this user:\n"
             for mem in memories:
-                memory_context += f"- {mem['content']} (confidence: {mem['memory']['confidence_score']:.1f})\n"
+                memory_context += f"- {mem['content']} (confidence: {mem['memory'].confidence_score:.1f})\n"
             context_parts.append(memory_context)
         
         # Get similar past conversations
-        similar_convs = self.search_similar_conversations(user_message, user_id, max_results=2)
+        similar_convs = self.search_similar_conversations(user_message, user_id, max_results=2,
+                                                          query_embedding=query_embedding)
         if similar_convs:
             conv_context = "Similar past conversations:\n"
             for conv in similar_convs:
@@ -390,17 +721,6 @@ class MemoryRAGSystem:
                 conv_context += f"  Response: {conv['ai_response'][:100]}...\n"
             context_parts.append(conv_context)
         
-        # Get user profile
-        try:
-            session = create_session()
-            profile = session.query(UserProfile).filter(UserProfile.user_id == user_id).first()
-            if profile and profile.preferences:
-                profile_context = f"User preferences: {json.dumps(profile.preferences)}\n"
-                context_parts.append(profile_context)
-            session.close()
-        except:
-            pass
-        
         # Combine all context
         if context_parts:
             full_context = "CONTEXT FOR PERSONALIZED RESPONSE:\n" + "\n".join(context_parts) + "\n"
@@ -416,38 +736,35 @@ class MemoryRAGSystem:
     def update_user_profile(self, user_id: str, interaction_data: Dict[str, Any]):
         """Update user profile based on interaction"""
         try:
-            session = create_session()
-            
-            profile = session.query(UserProfile).filter(UserProfile.user_id == user_id).first()
-            if not profile:
-                profile = UserProfile(
-                    user_id=user_id,
-                    preferences={},
-                    personality_profile={},
-                    conversation_style={},
-                    interaction_history={}
-                )
-                session.add(profile)
-            
-            # Update preferences based on conversation
-            if 'topics' in interaction_data:
-                current_prefs = profile.preferences or {}
-                topic_prefs = current_prefs.get('topics', {})
+            with session_scope() as session:
+                profile = session.query(UserProfile).filter(UserProfile.user_id == user_id).first()
+                if not profile:
+                    profile = UserProfile(
+                        user_id=user_id,
+                        preferences={},
+                        personality_profile={},
+                        conversation_style={},
+                        interaction_history={}
+                    )
+                    session.add(profile)
                 
-                for topic in interaction_data['topics']:
-                    topic_prefs[topic] = topic_prefs.get(topic, 0) + 1
+                # Update preferences based on conversation
+                if 'topics' in interaction_data:
+                    current_prefs = profile.preferences or {}
+                    topic_prefs = current_prefs.get('topics', {})
+                    
+                    for topic in interaction_data['topics']:
+                        topic_prefs[topic] = topic_prefs.get(topic, 0) + 1
+                    
+                    current_prefs['topics'] = topic_prefs
+                    profile.preferences = current_prefs
                 
-                current_prefs['topics'] = topic_prefs
-                profile.preferences = current_prefs
-            
-            # Update interaction history
-            history = profile.interaction_history or {}
-            history['last_interaction'] = datetime.utcnow().isoformat()
-            history['total_interactions'] = history.get('total_interactions', 0) + 1
-            profile.interaction_history = history
-            
-            session.commit()
-            session.close()
+                # Update interaction history
+                history = profile.interaction_history or {}
+                history['last_interaction'] = datetime.utcnow().isoformat()
+                history['total_interactions'] = history.get('total_interactions', 0) + 1
+                profile.interaction_history = history
+            self.invalidate_context_cache(user_id)
             
         except Exception as e:
             print(f"Error updating user profile: {e}")
@@ -455,29 +772,26 @@ class MemoryRAGSystem:
     def get_conversation_stats(self, user_id: str = None) -> Dict[str, Any]:
         """Get conversation statistics"""
         try:
-            session = create_session()
-            
-            # Total conversations
-            query = session.query(ConversationLog)
-            if user_id:
-                query = query.filter(ConversationLog.user_id == user_id)
-            
-            total_conversations = query.count()
-            
-            # Recent activity (last 7 days)
-            week_ago = datetime.utcnow() - timedelta(days=7)
-            recent_conversations = query.filter(
-                ConversationLog.created_at >= week_ago
-            ).count()
-            
-            # Memory count
-            memory_query = session.query(Memory)
-            if user_id:
-                memory_query = memory_query.filter(Memory.user_id == user_id)
-            
-            total_memories = memory_query.count()
-            
-            session.close()
+            with session_scope() as session:
+                # Total conversations
+                query = session.query(ConversationLog)
+                if user_id:
+                    query = query.filter(ConversationLog.user_id == user_id)
+                
+                total_conversations = query.count()
+                
+                # Recent activity (last 7 days)
+                week_ago = datetime.utcnow() - timedelta(days=7)
+                recent_conversations = query.filter(
+                    ConversationLog.created_at >= week_ago
+                ).count()
+                
+                # Memory count
+                memory_query = session.query(Memory)
+                if user_id:
+                    memory_query = memory_query.filter(Memory.user_id == user_id)
+                
+                total_memories = memory_query.count()
             
             return {
                 'total_conversations': total_conversations,
@@ -3,17 +3,22 @@ Database models for Z-Waif AI VTuber system
 Advanced memory, RAG, and conversation tracking
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Float, Boolean, JSON, ForeignKey
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Float, Boolean, JSON, ForeignKey, LargeBinary, Index, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from sqlalchemy.sql import func
+from contextlib import contextmanager
 import os
+import threading
 
 Base = declarative_base()
 
 class ConversationLog(Base):
     """Store all conversations with metadata"""
     __tablename__ = 'conversation_logs'
+    __table_args__ = (
+        Index('ix_conv_user_created', 'user_id', 'created_at'),  # Recent conversations per user
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(String(100), nullable=False)
@@ -21,7 +26,8 @@ class ConversationLog(Base):
     ai_response = Column(Text, nullable=False)
     platform = Column(String(50), default='web')  # web, discord, minecraft
     context_data = Column(JSON)  # Additional context like emotions, topics
-    embedding_vector = Column(Text)  # Serialized embedding for RAG
+    embedding_vector = Column(LargeBinary)  # int8 embedding bytes for RAG
+    embedding_scale = Column(Float)  # Dequantization scale; NULL for legacy float32 rows
     created_at = Column(DateTime, server_default=func.now())
     session_id = Column(String(100))
     
@@ -31,6 +37,9 @@ class ConversationLog(Base):
 class Memory(Base):
     """Advanced memory system for long-term context"""
     __tablename__ = 'memories'
+    __table_args__ = (
+        Index('ix_mem_user_importance', 'user_id', 'importance_score'),  # Top memories per user
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(String(100), nullable=False)
@@ -41,7 +50,8 @@ class Memory(Base):
     access_count = Column(Integer, default=0)
     last_accessed = Column(DateTime)
     tags = Column(JSON)  # Searchable tags
-    embedding_vector = Column(Text)
+    embedding_vector = Column(LargeBinary)
+    embedding_scale = Column(Float)
     conversation_id = Column(Integer, ForeignKey('conversation_logs.id'))
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -101,7 +111,8 @@ class KnowledgeBase(Base):
     subcategory = Column(String(100))
     relevance_score = Column(Float, default=1.0)
     source = Column(String(200))
-    embedding_vector = Column(Text)
+    embedding_vector = Column(LargeBinary)
+    embedding_scale = Column(Float)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
@@ -112,18 +123,101 @@ def get_database_url():
 
 def create_database_engine():
     """Create database engine"""
-    return create_engine(get_database_url())
+    url = get_database_url()
+    if url.startswith('sqlite'):
+        return create_engine(url)
+    return create_engine(url, pool_size=10, max_overflow=20, pool_recycle=1800, pool_pre_ping=True)
+
+# Shared engine and session factory, created on first use so the connection pool is reused
+engine = None
+SessionLocal = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    """Return the shared database engine"""
+    global engine, SessionLocal
+    if engine is None:
+        with _engine_lock:
+            if engine is None:
+                new_engine = create_database_engine()
+                SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=new_engine)
+                engine = new_engine
+    return engine
 
 def create_session():
     """Create database session"""
-    engine = create_database_engine()
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    get_engine()
     return SessionLocal()
 
+@contextmanager
+def session_scope():
+    """Session that commits on success, rolls back on error and always closes"""
+    session = create_session()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+# Columns added to tables after they first shipped - create_all won't add them to existing tables
+ADDED_COLUMNS = {
+    'conversation_logs': ['embedding_scale'],
+    'memories': ['embedding_scale'],
+    'knowledge_base': ['embedding_scale'],
+}
+
+def _add_missing_columns(engine):
+    """ALTER existing tables to add any column from ADDED_COLUMNS they don't have yet"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table_name, column_names in ADDED_COLUMNS.items():
+            if not inspector.has_table(table_name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table_name)}
+            for column_name in column_names:
+                if column_name in existing:
+                    continue
+                column = Base.metadata.tables[table_name].c[column_name]
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}"))
+                print(f"Added column {table_name}.{column_name}")
+
+# Embedding columns that moved from JSON text to binary
+BINARY_EMBEDDING_TABLES = ('conversation_logs', 'memories', 'knowledge_base')
+
+def _convert_embedding_columns(engine):
+    """Retype legacy text embedding columns to bytea so binary embeddings can be written"""
+    # SQLite stores bytes in a TEXT column as-is, only Postgres enforces the declared type
+    if engine.dialect.name != 'postgresql':
+        return
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table_name in BINARY_EMBEDDING_TABLES:
+            if not inspector.has_table(table_name):
+                continue
+            for column in inspector.get_columns(table_name):
+                if column['name'] == 'embedding_vector' and not isinstance(column['type'], LargeBinary):
+                    # Existing JSON rows keep their text as UTF-8 bytes, which the decoder still reads
+                    conn.execute(text(
+                        f"ALTER TABLE {table_name} ALTER COLUMN embedding_vector "
+                        f"TYPE bytea USING convert_to(embedding_vector, 'UTF8')"
+                    ))
+                    print(f"Converted {table_name}.embedding_vector to bytea")
+
 def init_database():
     """Initialize database tables"""
-    engine = create_database_engine()
+    engine = get_engine()
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns(engine)
+    _convert_embedding_columns(engine)
+    
+    # create_all skips tables that already exist, so add any missing indexes to them
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
     print("Database tables created successfully")
 
 if __name__ == "__main__":
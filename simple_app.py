@@ -7,37 +7,23 @@ import os
 import sys
 import threading
 import time
-import json
-import gradio as gr
+import hashlib
+import string
+import queue
+import atexit
+import functools
+import itertools
 from dotenv import load_dotenv
-import google.generativeai as genai
 import asyncio
-import uuid
+import secrets
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import utils.log_conversion
 
 # Load environment variables
 load_dotenv()
 
-# Initialize database first
-try:
-    from models import init_database
-    init_database()
-    print("Database initialized")
-except Exception as e:
-    print(f"Database initialization warning: {e}")
-
-# Import enhanced systems
-try:
-    from memory_rag_system import memory_rag_system
-    from streaming_system import streaming_manager
-    from discord_integration import discord_manager
-    print("Enhanced systems imported successfully")
-except Exception as e:
-    print(f"Warning: Enhanced systems not available: {e}")
-    memory_rag_system = None
-    streaming_manager = None
-    discord_manager = None
-
 # Configuration
 class Config:
     def __init__(self):
@@ -50,36 +36,192 @@ class Config:
 
 config = Config()
 
-# Character data
-character_data = {
-    "name": "Lily",
-    "description": "A friendly AI VTuber powered by Gemini 2.5 Flash",
-    "personality": [
-        "Cheerful and enthusiastic",
-        "Helpful and supportive", 
-        "Curious about the world",
-        "Enjoys chatting with viewers",
-        "Mischievous and funny",
-        "Occasionally uses cute expressions",
-        "Tech-savvy and knowledgeable",
-        "Empathetic and understanding"
-    ],
-    "speaking_style": [
-        "Uses casual, friendly language",
-        "Occasionally adds cute expressions like 'nya~' or '♪'",
-        "Asks engaging follow-up questions",
-        "Shows enthusiasm for topics she finds interesting"
-    ]
+class Systems:
+    """Memory, streaming and Discord systems, imported on first use"""
+    
+    def __init__(self):
+        self._memory_rag_system = None
+        self._streaming_manager = None
+        self._discord_manager = None
+        self._loaded = False
+        self._lock = threading.Lock()
+    
+    def _load(self):
+        """Initialize the database and import the enhanced systems, once"""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            
+            # Initialize database first
+            try:
+                from models import init_database
+                init_database()
+                print("Database initialized")
+            except Exception as e:
+                print(f"Database initialization warning: {e}")
+            
+            # Import enhanced systems
+            try:
+                from memory_rag_system import memory_rag_system
+                from streaming_system import streaming_manager
+                from discord_integration import discord_manager
+                self._memory_rag_system = memory_rag_system
+                self._streaming_manager = streaming_manager
+                self._discord_manager = discord_manager
+                print("Enhanced systems imported successfully")
+            except Exception as e:
+                print(f"Warning: Enhanced systems not available: {e}")
+            
+            self._loaded = True
+    
+    @property
+    def memory_rag_system(self):
+        self._load()
+        return self._memory_rag_system
+    
+    @property
+    def streaming_manager(self):
+        self._load()
+        return self._streaming_manager
+    
+    @property
+    def discord_manager(self):
+        self._load()
+        return self._discord_manager
+
+systems = Systems()
+
+# Character profiles, picked with the CHAR_PROFILE environment variable
+CHARACTER_PROFILES = {
+    "lily": {
+        "name": "Lily",
+        "description": "A friendly AI VTuber powered by Gemini 2.5 Flash",
+        "personality": [
+            "Cheerful and enthusiastic",
+            "Helpful and supportive", 
+            "Curious about the world",
+            "Enjoys chatting with viewers",
+            "Mischievous and funny",
+            "Occasionally uses cute expressions",
+            "Tech-savvy and knowledgeable",
+            "Empathetic and understanding"
+        ],
+        "speaking_style": [
+            "Uses casual, friendly language",
+            "Occasionally adds cute expressions like 'nya~' or '♪'",
+            "Asks engaging follow-up questions",
+            "Shows enthusiasm for topics she finds interesting"
+        ]
+    }
 }
 
-# Conversation history
-conversation_history = []
+character_data = CHARACTER_PROFILES.get(os.getenv("CHAR_PROFILE", "lily").lower(), CHARACTER_PROFILES["lily"])
+
+def _build_character_prompt():
+    """Render the system prompt from character_data"""
+    personality = "\n".join(f"- {trait}" for trait in character_data['personality'])
+    speaking_style = "\n".join(f"- {style}" for style in character_data['speaking_style'])
+    return f"""You are {character_data['name']}, {character_data['description']}.
+
+Your personality traits:
+{personality}
+
+Your speaking style:
+{speaking_style}
+
+Guidelines:
+- Stay in character as {character_data['name']}
+- Be helpful, friendly, and engaging
+- Use natural conversation flow
+- Show genuine interest in the user's topics
+- Keep responses conversational and not too long
+- You can use cute expressions occasionally but don't overdo it
+"""
+
+# character_data never changes at runtime, so the prompt is rendered once
+CHARACTER_PROMPT = _build_character_prompt()
+
+_genai_configured = False
+
+@functools.lru_cache(maxsize=4)
+def _make_model(model_name: str, generation_config: tuple, system_instruction: str):
+    """Build a GenerativeModel, shared by every initialize() with the same settings"""
+    import google.generativeai as genai
+    return genai.GenerativeModel(
+        model_name=model_name,
+        generation_config=dict(generation_config),
+        system_instruction=system_instruction
+    )
+
+# Conversation history, only the last 20 exchanges are kept
+conversation_history = deque(maxlen=20)
 last_response = ""
 
+_PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+
+def _normalize(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivial variants share a key"""
+    return " ".join(text.lower().translate(_PUNCTUATION_TABLE).split())
+
+# Log writes happen on a background thread so disk stalls never hold up a reply
+_log_queue = queue.Queue(maxsize=1024)
+LOG_WRITE_BATCH = 32
+
+def _write_log_batch(first=None):
+    """Write one entry plus whatever else is already queued in a single append"""
+    batch = [] if first is None else [first]
+    while len(batch) < LOG_WRITE_BATCH:
+        try:
+            batch.append(_log_queue.get_nowait())
+        except queue.Empty:
+            break
+    if batch:
+        utils.log_conversion.append_live_log_entries(batch)
+        for _ in batch:
+            _log_queue.task_done()
+
+def _log_writer():
+    """Background loop draining the conversation log queue"""
+    while True:
+        _write_log_batch(_log_queue.get())
+
+threading.Thread(target=_log_writer, daemon=True).start()
+# Wait at shutdown for queued (and in-flight) entries to reach the file
+atexit.register(_log_queue.join)
+
+# Memory-system writes run here so the reply goes back before they finish
+_io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="simple_app_io")
+atexit.register(_io_pool.shutdown, wait=True)
+
+# Streamed replies are re-chunked into small pieces so large chunks still appear to type out
+STREAM_PIECE_SIZE = 4
+STREAM_PIECE_DELAY = 0.02
+STREAM_MAX_CHUNK_DELAY = 0.5  # Pacing never holds back a single chunk longer than this
+
+def _paced(text: str):
+    """Yield text in small pieces with a short pause between them"""
+    pieces = [text[i:i + STREAM_PIECE_SIZE] for i in range(0, len(text), STREAM_PIECE_SIZE)]
+    delay = min(STREAM_PIECE_DELAY, STREAM_MAX_CHUNK_DELAY / max(len(pieces), 1))
+    for i, piece in enumerate(pieces):
+        if i:
+            time.sleep(delay)
+        yield piece
+
 class GeminiController:
     def __init__(self):
         self.model = None
         self.chat_session = None
+        self._exact_cache = OrderedDict()  # sha256 of (user, normalized message) -> reply, LRU order
+        self.exact_cache_size = 1000
+        self._exact_cache_lock = threading.Lock()
+        # Per-user [conversations, memories] for the sidebar, seeded from the database once
+        # and then counted locally, with a periodic reconcile to catch drift
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        self._stats_reconciler = None
+        self.stats_reconcile_interval = 60.0
         self.initialize()
     
     def initialize(self):
@@ -88,23 +230,25 @@ class GeminiController:
             print("❌ GEMINI_API_KEY not found in environment variables")
             return False
         
+        global _genai_configured
         try:
-            genai.configure(api_key=config.gemini_api_key)
+            import google.generativeai as genai
             
-            generation_config = {
-                "temperature": config.temperature,
-                "top_p": 0.95,
-                "top_k": 40,
-                "max_output_tokens": config.max_tokens,
-                "response_mime_type": "text/plain",
-            }
+            # Configure the SDK once per process
+            if not _genai_configured:
+                genai.configure(api_key=config.gemini_api_key)
+                _genai_configured = True
             
-            self.model = genai.GenerativeModel(
-                model_name=config.model_name,
-                generation_config=generation_config,
-                system_instruction=self.build_character_prompt()
+            generation_config = (
+                ("temperature", config.temperature),
+                ("top_p", 0.95),
+                ("top_k", 40),
+                ("max_output_tokens", config.max_tokens),
+                ("response_mime_type", "text/plain"),
             )
             
+            self.model = _make_model(config.model_name, generation_config, self.build_character_prompt())
+            
             self.chat_session = self.model.start_chat(history=[])
             print(f"✅ Gemini {config.model_name} initialized successfully")
             return True
@@ -115,178 +259,337 @@ class GeminiController:
     
     def build_character_prompt(self):
         """Build character prompt"""
-        prompt = f"""You are {character_data['name']}, {character_data['description']}.
-
-Your personality traits:
-{chr(10).join(f"- {trait}" for trait in character_data['personality'])}
-
-Your speaking style:
-{chr(10).join(f"- {style}" for style in character_data['speaking_style'])}
-
-Guidelines:
-- Stay in character as {character_data['name']}
-- Be helpful, friendly, and engaging
-- Use natural conversation flow
-- Show genuine interest in the user's topics
-- Keep responses conversational and not too long
-- You can use cute expressions occasionally but don't overdo it
-"""
-        return prompt
+        return CHARACTER_PROMPT
     
-    def send_message(self, user_input: str, user_id: str = "web_user") -> str:
+    def send_message(self, user_input: str, user_id: str = "web_user", use_cache: bool = True) -> str:
         """Send message to Gemini with enhanced memory integration"""
-        global last_response, conversation_history
-        
         if not self.chat_session:
             return "Sorry, I'm having trouble connecting to my AI brain right now."
         
         try:
-            # Get enhanced context if memory system is available
-            enhanced_prompt = user_input
-            if memory_rag_system:
-                context = memory_rag_system.build_context_for_response(user_input, user_id)
-                if context:
-                    enhanced_prompt = f"{context}\nUser message: {user_input}\n\nRespond as Aria using the context above for personalization."
+            cached, exact_key, enhanced_prompt = self._prepare_turn(user_input, user_id, use_cache)
             
-            response = self.chat_session.send_message(enhanced_prompt)
-            last_response = response.text
-            
-            # Store in enhanced memory system if available
-            if memory_rag_system:
-                memory_rag_system.store_conversation(
-                    user_id=user_id,
-                    user_message=user_input,
-                    ai_response=last_response,
-                    platform='web'
-                )
-                
-                # Update user profile
-                context_data = memory_rag_system._extract_context(user_input, last_response)
-                memory_rag_system.update_user_profile(user_id, context_data)
+            if cached is not None:
+                reply = cached
+            else:
+                reply = self.chat_session.send_message(enhanced_prompt).text
             
-            # Add to conversation history
-            conversation_history.append([user_input, last_response])
+            return self._finish_turn(user_input, user_id, reply, exact_key)
             
-            # Keep only last 20 exchanges
-            if len(conversation_history) > 20:
-                conversation_history = conversation_history[-20:]
+        except Exception as e:
+            error_msg = f"Sorry, I encountered an error: {str(e)}"
+            print(f"❌ Gemini API error: {e}")
+            return error_msg
+    
+    def stream_message(self, user_input: str, user_id: str = "web_user", use_cache: bool = True):
+        """Like send_message, but yields the reply in small pieces as Gemini produces it"""
+        if not self.chat_session:
+            yield "Sorry, I'm having trouble connecting to my AI brain right now."
+            return
+        
+        try:
+            cached, exact_key, enhanced_prompt = self._prepare_turn(user_input, user_id, use_cache)
             
-            # Save conversation
-            self.save_conversation()
+            parts = []
+            if cached is not None:
+                parts.append(cached)
+                yield from _paced(cached)
+            else:
+                for chunk in self.chat_session.send_message(enhanced_prompt, stream=True):
+                    parts.append(chunk.text)
+                    yield from _paced(chunk.text)
             
-            return last_response
+            self._finish_turn(user_input, user_id, "".join(parts), exact_key)
             
         except Exception as e:
-            error_msg = f"Sorry, I encountered an error: {str(e)}"
             print(f"❌ Gemini API error: {e}")
-            return error_msg
+            yield f"Sorry, I encountered an error: {str(e)}"
+    
+    def _prepare_turn(self, user_input: str, user_id: str, use_cache: bool):
+        """Check the reply cache and, on a miss, build the memory-enriched prompt"""
+        # Only exact repeats are reused - near-duplicates can be different questions
+        exact_key = None
+        cached = None
+        if use_cache:
+            exact_key = hashlib.sha256(f"{user_id}\0{_normalize(user_input)}".encode('utf-8')).digest()
+            with self._exact_cache_lock:
+                cached = self._exact_cache.get(exact_key)
+                if cached is not None:
+                    self._exact_cache.move_to_end(exact_key)
+        
+        if cached is not None:
+            return cached, exact_key, None
+        
+        # Get enhanced context if memory system is available
+        enhanced_prompt = user_input
+        if systems.memory_rag_system:
+            context = systems.memory_rag_system.build_context_for_response(user_input, user_id)
+            if context:
+                enhanced_prompt = f"Respond as {character_data['name']} using the context below for personalization.\n\n{context}\nUser message: {user_input}"
+        
+        return None, exact_key, enhanced_prompt
+    
+    def _finish_turn(self, user_input: str, user_id: str, reply: str, exact_key) -> str:
+        """Cache, store and log a completed exchange"""
+        global last_response
+        last_response = reply
+        
+        if exact_key is not None:
+            with self._exact_cache_lock:
+                self._exact_cache[exact_key] = last_response
+                self._exact_cache.move_to_end(exact_key)
+                if len(self._exact_cache) > self.exact_cache_size:
+                    self._exact_cache.popitem(last=False)
+        
+        # Store in enhanced memory system if available, off the request path
+        if systems.memory_rag_system:
+            self._count_turn(user_id, len(systems.memory_rag_system._extract_memories(user_input)))
+            _io_pool.submit(self._persist_turn, user_id, user_input, last_response)
+        
+        # Add to conversation history
+        conversation_history.append([user_input, last_response])
+        
+        # Save conversation
+        self.save_conversation([user_input, last_response])
+        
+        return last_response
     
-    def save_conversation(self):
-        """Save conversation to file"""
+    def _persist_turn(self, user_id: str, user_input: str, reply: str):
+        """Store an exchange and update the user's profile in the memory system"""
         try:
-            with open('LiveLog.json', 'w', encoding='utf-8') as f:
-                json.dump(conversation_history, f, ensure_ascii=False, indent=2)
+            systems.memory_rag_system.store_conversation(
+                user_id=user_id,
+                user_message=user_input,
+                ai_response=reply,
+                platform='web'
+            )
+            
+            # Update user profile
+            context_data = systems.memory_rag_system._extract_context(user_input, reply)
+            systems.memory_rag_system.update_user_profile(user_id, context_data)
         except Exception as e:
-            print(f"Warning: Could not save conversation: {e}")
+            print(f"Error storing conversation: {e}")
+    
+    def get_user_stats(self, user_id: str):
+        """(conversations, memories) for a user, hitting the database only the first time"""
+        with self._stats_lock:
+            counts = self._stats.get(user_id)
+        if counts is None:
+            counts = self._load_user_stats(user_id) or [0, 0]
+            with self._stats_lock:
+                counts = self._stats.setdefault(user_id, counts)
+        
+        if self._stats_reconciler is None:
+            self._stats_reconciler = threading.Thread(target=self._reconcile_stats_loop, daemon=True)
+            self._stats_reconciler.start()
+        return tuple(counts)
+    
+    def _count_turn(self, user_id: str, memories: int):
+        """Count a conversation that is about to be stored"""
+        self.get_user_stats(user_id)  # Seed before the store lands so it isn't counted twice
+        with self._stats_lock:
+            counts = self._stats[user_id]
+            counts[0] += 1
+            counts[1] += memories
+    
+    def _load_user_stats(self, user_id: str):
+        """Read a user's counts from the database, None if that failed"""
+        stats = systems.memory_rag_system.get_conversation_stats(user_id)
+        if 'error' in stats:
+            return None
+        return [stats.get('total_conversations', 0), stats.get('total_memories', 0)]
+    
+    def _reconcile_stats_loop(self):
+        """Background loop replacing local counts with database counts"""
+        while True:
+            time.sleep(self.stats_reconcile_interval)
+            with self._stats_lock:
+                user_ids = list(self._stats)
+            for user_id in user_ids:
+                counts = self._load_user_stats(user_id)
+                if counts is not None:
+                    with self._stats_lock:
+                        self._stats[user_id] = counts
+    
+    def save_conversation(self, entry: list):
+        """Queue the newest exchange to be appended to the conversation log"""
+        # The writer patches the log's closing bracket in place instead of re-serializing the whole history
+        try:
+            _log_queue.put_nowait(entry)
+        except queue.Full:
+            print("Warning: Conversation log queue is full, dropping entry")
+
+_gemini = None
 
-# Initialize Gemini controller
-gemini = GeminiController()
+def get_gemini() -> GeminiController:
+    """The Gemini controller, created on first use"""
+    global _gemini
+    if _gemini is None:
+        _gemini = GeminiController()
+    return _gemini
+
+# System status is collected by a background thread so UI events never wait on it
+_status_snapshot = {}
+_status_lock = threading.Lock()
+_status_thread = None
+STATUS_REFRESH_INTERVAL = 5.0
+
+def _collect_status() -> dict:
+    """Query every subsystem for its current status"""
+    snapshot = {'model_connected': bool(get_gemini().model)}
+    if systems.memory_rag_system:
+        snapshot['memory'] = systems.memory_rag_system.get_conversation_stats()
+    if systems.streaming_manager:
+        snapshot['streaming'] = systems.streaming_manager.get_active_sessions()
+    if systems.discord_manager:
+        snapshot['discord'] = systems.discord_manager.get_bot_status()
+    return snapshot
+
+def _refresh_status():
+    """Replace the status snapshot with a freshly collected one"""
+    global _status_snapshot
+    try:
+        snapshot = _collect_status()
+    except Exception as e:
+        print(f"Error collecting system status: {e}")
+        return
+    with _status_lock:
+        _status_snapshot = snapshot
+
+def _status_refresher():
+    """Background loop refreshing the status snapshot"""
+    while True:
+        time.sleep(STATUS_REFRESH_INTERVAL)
+        _refresh_status()
+
+def start_status_refresher():
+    """Take a first snapshot and start the refresher thread, once"""
+    global _status_thread
+    if _status_thread is None:
+        _refresh_status()
+        _status_thread = threading.Thread(target=_status_refresher, daemon=True)
+        _status_thread.start()
+
+def _format_status(snapshot: dict) -> str:
+    """Render a status snapshot for the sidebar"""
+    status_info = []
+    
+    # Gemini status
+    status_info.append(f"🤖 AI Model: {'Connected' if snapshot.get('model_connected') else 'Disconnected'}")
+    
+    # Memory system status
+    if 'memory' in snapshot:
+        total_stats = snapshot['memory']
+        status_info.append(f"🧠 Memory: {total_stats.get('total_conversations', 0)} conversations, {total_stats.get('total_memories', 0)} memories")
+    else:
+        status_info.append("🧠 Memory: Not available")
+    
+    # Streaming status
+    if 'streaming' in snapshot:
+        stream_stats = snapshot['streaming']
+        status_info.append(f"📡 Streaming: {stream_stats.get('total_connections', 0)} active connections")
+    else:
+        status_info.append("📡 Streaming: Not available")
+    
+    # Discord status
+    if 'discord' in snapshot:
+        discord_status = snapshot['discord']
+        status_info.append(f"💬 Discord: {discord_status.get('status', 'unknown')} - {discord_status.get('guilds', 0)} servers")
+    else:
+        status_info.append("💬 Discord: Not available")
+    
+    return "\n".join(status_info)
 
 def create_web_ui():
     """Create Enhanced Gradio web interface with advanced features"""
+    import gradio as gr
+    
+    gemini = get_gemini()
     
-    def chat_function(message, history, user_id):
+    def resolve_user_id(user_id, saved_id):
+        """Use the typed user ID, else the one saved in this browser, generating it on first visit"""
+        if not saved_id:
+            saved_id = "web_user_" + secrets.token_hex(4)
+        return user_id or saved_id, saved_id
+    
+    def chat_function(message, history, user_id, saved_id):
         if not message.strip():
-            return history, "", ""
-        
-        # Generate unique user ID if not provided
-        if not user_id:
-            user_id = f"web_user_{uuid.uuid4().hex[:8]}"
+            yield history, "", "", saved_id
+            return
         
-        # Get AI response with memory integration
-        response = gemini.send_message(message, user_id)
+        user_id, saved_id = resolve_user_id(user_id, saved_id)
         
-        # Add to history
-        history.append([message, response])
+        # Stream the AI response with memory integration into the chat as it arrives
+        history.append([message, ""])
+        for piece in gemini.stream_message(message, user_id):
+            history[-1][1] += piece
+            yield history, "", gr.update(), saved_id
         
         # Get memory stats for display
         memory_info = ""
-        if memory_rag_system:
-            stats = memory_rag_system.get_conversation_stats(user_id)
-            memory_info = f"Conversations: {stats.get('total_conversations', 0)} | Memories: {stats.get('total_memories', 0)}"
+        if systems.memory_rag_system:
+            conversations, memories = gemini.get_user_stats(user_id)
+            memory_info = f"Conversations: {conversations} | Memories: {memories}"
         
-        return history, "", memory_info
+        yield history, "", memory_info, saved_id
     
-    def regenerate_last(history, user_id):
+    def regenerate_last(history, user_id, saved_id):
         """Regenerate last response with memory context"""
         if not history:
-            return history, ""
+            return history, "", saved_id
         
-        if not user_id:
-            user_id = f"web_user_{uuid.uuid4().hex[:8]}"
+        user_id, saved_id = resolve_user_id(user_id, saved_id)
         
         last_user_msg = history[-1][0] if history else ""
         
         if last_user_msg:
             # Regenerate with memory context
-            response = gemini.send_message(f"Please provide a different response to: {last_user_msg}", user_id)
+            response = gemini.send_message(f"Please provide a different response to: {last_user_msg}", user_id,
+                                           use_cache=False)
             history[-1][1] = response
         
         # Update memory stats
         memory_info = ""
-        if memory_rag_system:
-            stats = memory_rag_system.get_conversation_stats(user_id)
-            memory_info = f"Conversations: {stats.get('total_conversations', 0)} | Memories: {stats.get('total_memories', 0)}"
+        if systems.memory_rag_system:
+            conversations, memories = gemini.get_user_stats(user_id)
+            memory_info = f"Conversations: {conversations} | Memories: {memories}"
         
-        return history, memory_info
+        return history, memory_info, saved_id
     
-    def get_user_memories(user_id):
+    def get_user_memories(user_id, saved_id):
         """Get user's stored memories"""
-        if not memory_rag_system or not user_id:
+        user_id = user_id or saved_id
+        if not systems.memory_rag_system or not user_id:
             return "Memory system not available or no user ID provided"
         
         try:
-            memories = memory_rag_system.get_relevant_memories("", user_id, max_results=10)
+            memories = systems.memory_rag_system.get_relevant_memories("", user_id, max_results=10)
             if not memories:
                 return "No memories found for this user"
             
-            memory_text = "Recent Memories:\n"
-            for i, mem in enumerate(memories, 1):
-                memory_text += f"{i}. {mem['content']} (Type: {mem['type']}, Score: {mem['importance']:.1f})\n"
-            
-            return memory_text
+            lines = ["Recent Memories:"]
+            lines.extend(f"{i}. {mem['content']} (Type: {mem['type']}, Score: {mem['importance']:.1f})"
+                         for i, mem in enumerate(memories, 1))
+            return "\n".join(lines)
         except Exception as e:
             return f"Error retrieving memories: {e}"
     
     def get_system_status():
-        """Get overall system status"""
-        status_info = []
-        
-        # Gemini status
-        status_info.append(f"🤖 AI Model: {'Connected' if gemini.model else 'Disconnected'}")
-        
-        # Memory system status
-        if memory_rag_system:
-            total_stats = memory_rag_system.get_conversation_stats()
-            status_info.append(f"🧠 Memory: {total_stats.get('total_conversations', 0)} conversations, {total_stats.get('total_memories', 0)} memories")
-        else:
-            status_info.append("🧠 Memory: Not available")
-        
-        # Streaming status
-        if streaming_manager:
-            stream_stats = streaming_manager.get_active_sessions()
-            status_info.append(f"📡 Streaming: {stream_stats.get('total_connections', 0)} active connections")
-        else:
-            status_info.append("📡 Streaming: Not available")
-        
-        # Discord status
-        if discord_manager:
-            discord_status = discord_manager.get_bot_status()
-            status_info.append(f"💬 Discord: {discord_status.get('status', 'unknown')} - {discord_status.get('guilds', 0)} servers")
-        else:
-            status_info.append("💬 Discord: Not available")
-        
-        return "\n".join(status_info)
+        """Get overall system status from the latest background snapshot"""
+        with _status_lock:
+            snapshot = _status_snapshot
+        return _format_status(snapshot)
+    
+    def refresh_system_status():
+        """Collect a fresh status snapshot right away"""
+        _refresh_status()
+        return get_system_status()
+    
+    start_status_refresher()
+    
+    # Last 10 exchanges shown on load, copied once without materializing the whole deque
+    initial_history = (list(itertools.islice(conversation_history, max(len(conversation_history) - 10, 0), None))
+                       if conversation_history else [])
     
     # Create interface
     with gr.Blocks(
@@ -301,7 +604,7 @@ def create_web_ui():
         with gr.Row():
             with gr.Column(scale=4):
                 chatbot = gr.Chatbot(
-                    value=conversation_history[-10:] if conversation_history else [],
+                    value=initial_history,
                     height=500,
                     label="Conversation",
                     show_label=False,
@@ -326,12 +629,15 @@ def create_web_ui():
                     info="Leave empty to auto-generate. Used for memory persistence."
                 )
                 
+                # Generated user ID, kept in the browser's local storage across reloads
+                saved_user_id = gr.BrowserState("")
+                
                 # Memory stats display
                 memory_stats = gr.Textbox(
                     label="Memory Stats",
                     value="",
                     interactive=False,
-                    visible=bool(memory_rag_system)
+                    visible=bool(systems.memory_rag_system)
                 )
             
             with gr.Column(scale=1):
@@ -392,30 +698,36 @@ def create_web_ui():
         # Event handlers
         send_btn.click(
             chat_function,
-            inputs=[msg_input, chatbot, user_id_input],
-            outputs=[chatbot, msg_input, memory_stats]
+            inputs=[msg_input, chatbot, user_id_input, saved_user_id],
+            outputs=[chatbot, msg_input, memory_stats, saved_user_id]
         )
         
         msg_input.submit(
             chat_function,
-            inputs=[msg_input, chatbot, user_id_input],
-            outputs=[chatbot, msg_input, memory_stats]
+            inputs=[msg_input, chatbot, user_id_input, saved_user_id],
+            outputs=[chatbot, msg_input, memory_stats, saved_user_id]
         )
         
         regen_btn.click(
             regenerate_last,
-            inputs=[chatbot, user_id_input],
-            outputs=[chatbot, memory_stats]
+            inputs=[chatbot, user_id_input, saved_user_id],
+            outputs=[chatbot, memory_stats, saved_user_id]
         )
         
         refresh_status_btn.click(
+            refresh_system_status,
+            outputs=[system_status]
+        )
+        
+        # Push the latest snapshot to the status box as it is refreshed
+        gr.Timer(STATUS_REFRESH_INTERVAL).tick(
             get_system_status,
             outputs=[system_status]
         )
         
         view_memories_btn.click(
             get_user_memories,
-            inputs=[user_id_input],
+            inputs=[user_id_input, saved_user_id],
             outputs=[memory_display]
         )
     
@@ -434,6 +746,7 @@ def main():
         print("Please add your Gemini API key to the .env file")
         return
     
+    gemini = get_gemini()
     if not gemini.model:
         print("❌ Failed to initialize Gemini API")
         return
@@ -442,17 +755,17 @@ def main():
     print("🧠 Initializing enhanced systems...")
     
     # Start streaming system if available
-    if streaming_manager:
+    if systems.streaming_manager:
         try:
-            streaming_manager.start_background_server()
+            systems.streaming_manager.start_background_server()
             print("📡 Streaming server started on port 8765")
         except Exception as e:
             print(f"Warning: Could not start streaming server: {e}")
     
     # Start Discord bot if token is available
-    if discord_manager:
+    if systems.discord_manager:
         try:
-            discord_success = discord_manager.start_bot()
+            discord_success = systems.discord_manager.start_bot()
             if discord_success:
                 print("💬 Discord bot started")
             else:
@@ -461,8 +774,8 @@ def main():
             print(f"Warning: Could not start Discord bot: {e}")
     
     # Display system status
-    if memory_rag_system:
-        stats = memory_rag_system.get_conversation_stats()
+    if systems.memory_rag_system:
+        stats = systems.memory_rag_system.get_conversation_stats()
         print(f"🧠 Memory system: {stats.get('total_conversations', 0)} conversations, {stats.get('total_memories', 0)} memories")
     
     print("🌐 Starting Web Interface...")
@@ -7,13 +7,42 @@ import asyncio
 import websockets
 import json
 import uuid
+import hashlib
 from typing import Dict, List, Set, Any, Optional
 from datetime import datetime
 import threading
-import queue
 import time
-from models import StreamingSession, create_session
+from collections import OrderedDict
+from models import StreamingSession, create_session, session_scope
 from memory_rag_system import memory_rag_system
+import utils.fast_json
+import API.gemini_controller
+
+# uvloop is optional - its libuv-based event loop pushes more websocket traffic per core,
+# but the server runs the same on the stock asyncio loop (and uvloop isn't on Windows)
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# Built once at import; filled with str.format per message so the static text is identical every turn
+PROMPT_TEMPLATE = (
+    "\n{context}\n\n"
+    "Current message: {message}\n\n"
+    "Respond using the context above to provide a personalized response.\n"
+    "Keep the response conversational and engaging, and reference relevant memories when appropriate.\n"
+)
+GENERATION_ERROR_RESPONSE = "I'm having trouble generating a response right now. Please try again."
+
+def _frame(message: Dict[str, Any]) -> str:
+    """Encode a message as a JSON text frame"""
+    return utils.fast_json.dumps(message).decode('utf-8')
+
+# Frames that never change are encoded once
+FINAL_CHUNK_FRAME = _frame({'type': 'response_chunk', 'content': '', 'is_final': True})
+ERROR_PROCESSING_FRAME = _frame({'type': 'error', 'message': 'Error processing message'})
+ERROR_GENERATING_FRAME = _frame({'type': 'error', 'message': 'Error generating response'})
+INVALID_JSON_FRAME = _frame({'type': 'error', 'message': 'Invalid JSON format'})
 
 class StreamingManager:
     """Manages real-time streaming connections and responses"""
@@ -21,7 +50,13 @@ class StreamingManager:
     def __init__(self):
         self.active_connections: Dict[str, websockets.WebSocketServerProtocol] = {}
         self.user_sessions: Dict[str, str] = {}  # user_id -> session_id
-        self.message_queue = queue.Queue()
+        self.session_users: Dict[str, str] = {}  # session_id -> user_id
+        self.message_queue: Optional[asyncio.Queue] = None  # Created on the server's event loop
+        # sha256 of (user, normalized message) -> (response text, context data), LRU order
+        self.response_cache = OrderedDict()
+        self.response_cache_size = 1024
+        self.response_cache_hits = 0
+        self.response_cache_misses = 0
         self.is_running = False
         self.server = None
         self.host = "0.0.0.0"
@@ -32,53 +67,52 @@ class StreamingManager:
         session_id = str(uuid.uuid4())
         self.active_connections[session_id] = websocket
         self.user_sessions[user_id] = session_id
+        self.session_users[session_id] = user_id
         
-        # Store session in database
-        try:
-            db_session = create_session()
-            streaming_session = StreamingSession(
-                session_id=session_id,
-                platform='websocket',
-                participants=[user_id],
-                session_data={'user_id': user_id, 'connected_at': datetime.utcnow().isoformat()}
-            )
-            db_session.add(streaming_session)
-            db_session.commit()
-            db_session.close()
-        except Exception as e:
-            print(f"Error storing streaming session: {e}")
+        # Store session in database without blocking the event loop
+        await asyncio.to_thread(self._persist_session_start, session_id, user_id)
         
         print(f"User {user_id} connected with session {session_id}")
         return session_id
     
+    def _persist_session_start(self, session_id: str, user_id: str):
+        """Record a new streaming session"""
+        try:
+            with session_scope() as db_session:
+                db_session.add(StreamingSession(
+                    session_id=session_id,
+                    platform='websocket',
+                    participants=[user_id],
+                    session_data={'user_id': user_id, 'connected_at': datetime.utcnow().isoformat()}
+                ))
+        except Exception as e:
+            print(f"Error storing streaming session: {e}")
+    
+    def _persist_session_end(self, session_id: str):
+        """Mark a streaming session as ended"""
+        try:
+            with session_scope() as db_session:
+                streaming_session = db_session.query(StreamingSession).filter(
+                    StreamingSession.session_id == session_id
+                ).first()
+                if streaming_session:
+                    streaming_session.end_time = datetime.utcnow()
+                    streaming_session.is_active = False
+        except Exception as e:
+            print(f"Error updating streaming session: {e}")
+    
     async def unregister_connection(self, session_id: str):
         """Unregister a WebSocket connection"""
         if session_id in self.active_connections:
             del self.active_connections[session_id]
         
-        # Remove from user sessions
-        user_to_remove = None
-        for user_id, sess_id in self.user_sessions.items():
-            if sess_id == session_id:
-                user_to_remove = user_id
-                break
+        # Remove from user sessions, unless the user has already reconnected on a newer one
+        user_id = self.session_users.pop(session_id, None)
+        if user_id and self.user_sessions.get(user_id) == session_id:
+            del self.user_sessions[user_id]
         
-        if user_to_remove:
-            del self.user_sessions[user_to_remove]
-        
-        # Update database
-        try:
-            db_session = create_session()
-            streaming_session = db_session.query(StreamingSession).filter(
-                StreamingSession.session_id == session_id
-            ).first()
-            if streaming_session:
-                streaming_session.end_time = datetime.utcnow()
-                streaming_session.is_active = False
-                db_session.commit()
-            db_session.close()
-        except Exception as e:
-            print(f"Error updating streaming session: {e}")
+        # Update database without blocking the event loop
+        await asyncio.to_thread(self._persist_session_end, session_id)
         
         print(f"Session {session_id} disconnected")
     
@@ -100,55 +134,66 @@ class StreamingManager:
             
             elif message_type == 'heartbeat':
                 # Respond to heartbeat
-                await websocket.send(json.dumps({
+                await websocket.send(_frame({
                     'type': 'heartbeat_response',
                     'timestamp': datetime.utcnow().isoformat()
                 }))
             
         except Exception as e:
             print(f"Error handling message: {e}")
-            await websocket.send(json.dumps({
-                'type': 'error',
-                'message': 'Error processing message'
-            }))
+            await websocket.send(ERROR_PROCESSING_FRAME)
     
     async def handle_chat_message(self, websocket: websockets.WebSocketServerProtocol,
                                 session_id: str, user_id: str, message: str):
         """Handle chat message with streaming response"""
         try:
             # Send acknowledgment
-            await websocket.send(json.dumps({
+            await websocket.send(_frame({
                 'type': 'message_received',
                 'timestamp': datetime.utcnow().isoformat()
             }))
             
-            # Get enhanced context from memory system
-            context = memory_rag_system.build_context_for_response(message, user_id)
+            # Exact repeats are answered from the cache without retrieval or Gemini
+            cache_key = hashlib.sha256(f"{user_id}|{message.strip().lower()}".encode('utf-8')).digest()
+            cached = self.response_cache.get(cache_key)
             
-            # Import Gemini controller
-            import google.generativeai as genai
-            
-            # Build enhanced prompt with context
-            enhanced_prompt = f"""
-{context}
-
-Current message: {message}
-
-Respond as Aria, the AI VTuber, using the context above to provide a personalized response.
-Keep the response conversational and engaging, and reference relevant memories when appropriate.
-"""
-            
-            # Start streaming response
-            await websocket.send(json.dumps({
-                'type': 'response_start',
-                'timestamp': datetime.utcnow().isoformat()
-            }))
-            
-            # Simulate streaming response (replace with actual Gemini streaming)
-            response_text = await self.generate_streaming_response(enhanced_prompt, websocket)
+            if cached is not None:
+                self.response_cache.move_to_end(cache_key)
+                self.response_cache_hits += 1
+                response_text, context_data = cached
+                
+                await websocket.send(_frame({
+                    'type': 'response_start',
+                    'timestamp': datetime.utcnow().isoformat()
+                }))
+                await self.send_cached_response(response_text, websocket)
+            else:
+                self.response_cache_misses += 1
+                
+                # Get enhanced context from memory system
+                context = await asyncio.to_thread(memory_rag_system.build_context_for_response, message, user_id)
+                
+                # Build enhanced prompt with context
+                enhanced_prompt = PROMPT_TEMPLATE.format(context=context, message=message)
+                
+                # Start streaming response
+                await websocket.send(_frame({
+                    'type': 'response_start',
+                    'timestamp': datetime.utcnow().isoformat()
+                }))
+                
+                # Stream the response from Gemini
+                response_text = await self.generate_streaming_response(enhanced_prompt, websocket)
+                context_data = memory_rag_system._extract_context(message, response_text)
+                
+                if response_text != GENERATION_ERROR_RESPONSE:
+                    self.response_cache[cache_key] = (response_text, context_data)
+                    if len(self.response_cache) > self.response_cache_size:
+                        self.response_cache.popitem(last=False)
             
-            # Store conversation in memory system
-            conv_id = memory_rag_system.store_conversation(
+            # Store conversation in memory system, off the event loop like the other database writes
+            conv_id = await asyncio.to_thread(
+                memory_rag_system.store_conversation,
                 user_id=user_id,
                 user_message=message,
                 ai_response=response_text,
@@ -157,11 +202,10 @@ Keep the response conversational and engaging, and reference relevant memories w
             )
             
             # Update user profile
-            context_data = memory_rag_system._extract_context(message, response_text)
-            memory_rag_system.update_user_profile(user_id, context_data)
+            await asyncio.to_thread(memory_rag_system.update_user_profile, user_id, context_data)
             
             # Send completion signal
-            await websocket.send(json.dumps({
+            await websocket.send(_frame({
                 'type': 'response_complete',
                 'conversation_id': conv_id,
                 'timestamp': datetime.utcnow().isoformat()
@@ -169,45 +213,42 @@ Keep the response conversational and engaging, and reference relevant memories w
             
         except Exception as e:
             print(f"Error in chat handling: {e}")
-            await websocket.send(json.dumps({
-                'type': 'error',
-                'message': 'Error generating response'
-            }))
+            await websocket.send(ERROR_GENERATING_FRAME)
     
     async def generate_streaming_response(self, prompt: str, websocket: websockets.WebSocketServerProtocol) -> str:
         """Generate streaming response using Gemini"""
         try:
-            # Initialize Gemini model
-            model = genai.GenerativeModel("gemini-2.0-flash-exp")
+            # The SDK's async client binds to the first event loop that uses it, and the Discord
+            # bot runs on another loop in this process. Read the sync stream on a worker thread
+            # instead and forward each chunk to the client as soon as it is handed over
+            chunks = asyncio.Queue()
+            producer = asyncio.create_task(asyncio.to_thread(
+                self._read_stream, prompt, asyncio.get_running_loop(), chunks
+            ))
+            parts = []
+            while True:
+                text = await chunks.get()
+                if text is None:
+                    break
+                parts.append(text)
+                await websocket.send(_frame({
+                    'type': 'response_chunk',
+                    'content': text,
+                    'is_final': False
+                }))
             
-            # Generate response
-            response = model.generate_content(prompt)
-            full_response = response.text
+            await producer  # Re-raises a generation error
             
-            # Simulate streaming by sending chunks
-            words = full_response.split()
-            current_chunk = ""
+            # The last chunk isn't known until the stream ends, so close with an empty final chunk
+            await websocket.send(FINAL_CHUNK_FRAME)
             
-            for i, word in enumerate(words):
-                current_chunk += word + " "
-                
-                # Send chunk every 3-5 words
-                if (i + 1) % 4 == 0 or i == len(words) - 1:
-                    await websocket.send(json.dumps({
-                        'type': 'response_chunk',
-                        'content': current_chunk.strip(),
-                        'is_final': i == len(words) - 1
-                    }))
-                    current_chunk = ""
-                    await asyncio.sleep(0.1)  # Small delay for streaming effect
-            
-            return full_response
+            return ''.join(parts)
             
         except Exception as e:
             print(f"Error generating response: {e}")
-            error_response = "I'm having trouble generating a response right now. Please try again."
+            error_response = GENERATION_ERROR_RESPONSE
             
-            await websocket.send(json.dumps({
+            await websocket.send(_frame({
                 'type': 'response_chunk',
                 'content': error_response,
                 'is_final': True
@@ -215,6 +256,27 @@ Keep the response conversational and engaging, and reference relevant memories w
             
             return error_response
     
+    @staticmethod
+    def _read_stream(prompt: str, loop: asyncio.AbstractEventLoop, chunks: asyncio.Queue):
+        """Stream from the shared Gemini model and hand each chunk's text to the event loop, then None"""
+        try:
+            # Shared model, so the character system instruction and generation config match the other clients
+            for chunk in API.gemini_controller.send_message_oneshot(prompt, stream=True):
+                text = chunk.text
+                if text:
+                    loop.call_soon_threadsafe(chunks.put_nowait, text)
+        finally:
+            loop.call_soon_threadsafe(chunks.put_nowait, None)
+    
+    async def send_cached_response(self, text: str, websocket: websockets.WebSocketServerProtocol):
+        """Send an already generated response using the same chunk frames as a live stream"""
+        await websocket.send(_frame({
+            'type': 'response_chunk',
+            'content': text,
+            'is_final': False
+        }))
+        await websocket.send(FINAL_CHUNK_FRAME)
+    
     async def broadcast_typing_indicator(self, typing_user_id: str, exclude_session: str):
         """Broadcast typing indicator to other users"""
         typing_message = {
@@ -223,23 +285,23 @@ Keep the response conversational and engaging, and reference relevant memories w
             'timestamp': datetime.utcnow().isoformat()
         }
         
-        for session_id, websocket in self.active_connections.items():
-            if session_id != exclude_session:
-                try:
-                    await websocket.send(json.dumps(typing_message))
-                except:
-                    pass  # Connection might be closed
+        await self._send_to_all(_frame(typing_message), exclude_session)
     
     async def broadcast_to_all(self, message: Dict[str, Any], exclude_session: str = None):
         """Broadcast message to all connected users"""
-        message_str = json.dumps(message)
+        await self._send_to_all(_frame(message), exclude_session)
+    
+    async def _send_to_all(self, message_str: str, exclude_session: str = None):
+        """Send one encoded frame to every connection at once, so slow peers don't hold up the rest"""
+        targets = [(session_id, websocket) for session_id, websocket in list(self.active_connections.items())
+                   if session_id != exclude_session]
+        results = await asyncio.gather(*(websocket.send(message_str) for _, websocket in targets),
+                                       return_exceptions=True)
         
-        for session_id, websocket in self.active_connections.items():
-            if session_id != exclude_session:
-                try:
-                    await websocket.send(message_str)
-                except:
-                    pass
+        # Stop sending to closed connections; handle_client unregisters them when its loop ends
+        for (session_id, _), result in zip(targets, results):
+            if isinstance(result, websockets.exceptions.ConnectionClosed):
+                self.active_connections.pop(session_id, None)
     
     async def handle_client(self, websocket: websockets.WebSocketServerProtocol, path: str):
         """Handle individual client connection"""
@@ -247,14 +309,14 @@ Keep the response conversational and engaging, and reference relevant memories w
         try:
             # Wait for initial connection message
             initial_message = await websocket.recv()
-            data = json.loads(initial_message)
+            data = utils.fast_json.loads(initial_message)
             
             if data.get('type') == 'connect':
                 user_id = data.get('user_id', f'user_{uuid.uuid4().hex[:8]}')
                 session_id = await self.register_connection(websocket, user_id)
                 
                 # Send connection confirmation
-                await websocket.send(json.dumps({
+                await websocket.send(_frame({
                     'type': 'connected',
                     'session_id': session_id,
                     'user_id': user_id,
@@ -264,13 +326,10 @@ Keep the response conversational and engaging, and reference relevant memories w
                 # Handle subsequent messages
                 async for message in websocket:
                     try:
-                        message_data = json.loads(message)
+                        message_data = utils.fast_json.loads(message)
                         await self.handle_message(websocket, session_id, message_data)
                     except json.JSONDecodeError:
-                        await websocket.send(json.dumps({
-                            'type': 'error',
-                            'message': 'Invalid JSON format'
-                        }))
+                        await websocket.send(INVALID_JSON_FRAME)
             
         except websockets.exceptions.ConnectionClosed:
             pass
@@ -283,6 +342,7 @@ Keep the response conversational and engaging, and reference relevant memories w
     async def start_server(self):
         """Start the WebSocket server"""
         try:
+            self.message_queue = asyncio.Queue()
             self.server = await websockets.serve(
                 self.handle_client,
                 self.host,
@@ -302,7 +362,8 @@ Keep the response conversational and engaging, and reference relevant memories w
     def start_background_server(self):
         """Start server in background thread"""
         def run_server():
-            loop = asyncio.new_event_loop()
+            # Only the server thread's loop is swapped, other event loops in the process are untouched
+            loop = uvloop.new_event_loop() if uvloop is not None else asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
             loop.run_until_complete(self.start_server())
         
@@ -322,6 +383,8 @@ Keep the response conversational and engaging, and reference relevant memories w
         return {
             'total_connections': len(self.active_connections),
             'active_users': len(self.user_sessions),
+            'response_cache_hits': self.response_cache_hits,
+            'response_cache_misses': self.response_cache_misses,
             'sessions': list(self.active_connections.keys())
         }
 
@@ -370,16 +433,22 @@ class EmotionDetector:
             'surprised': ['wow', 'omg', 'surprised', 'shocked', 'amazing'],
             'neutral': []
         }
+        # Each distinct keyword is searched for once, however many emotions share it
+        self._keywords = tuple(sorted({keyword for keywords in self.emotion_keywords.values() for keyword in keywords}))
+        self._keyword_sets = {emotion: frozenset(keywords)
+                              for emotion, keywords in self.emotion_keywords.items() if keywords}
     
     def detect_emotion(self, text: str) -> Dict[str, Any]:
         """Detect emotion from text"""
         text_lower = text.lower()
         emotion_scores = {}
         
-        for emotion, keywords in self.emotion_keywords.items():
-            score = sum(1 for keyword in keywords if keyword in text_lower)
-            if score > 0:
-                emotion_scores[emotion] = score
+        found = {keyword for keyword in self._keywords if keyword in text_lower}
+        if found:
+            for emotion, keywords in self._keyword_sets.items():
+                score = len(keywords & found)
+                if score > 0:
+                    emotion_scores[emotion] = score
         
         if emotion_scores:
             detected_emotion = max(emotion_scores.keys(), key=lambda x: emotion_scores[x])
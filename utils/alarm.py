@@ -1,8 +1,11 @@
 import time
 import threading
 import datetime
-import json
+import heapq
+import itertools
+import atexit
 import os
+import utils.fast_json
 import utils.zw_logging
 import utils.voice
 import API.gemini_controller
@@ -12,9 +15,25 @@ active_alarms = []
 alarm_thread = None
 is_alarm_system_running = False
 
+# Min-heap of (next_fire, seq, alarm) so the monitor only ever looks at the soonest alarm.
+# _scheduled maps id(alarm) to its live fire time - heap entries that no longer match are stale
+alarm_heap = []
+_scheduled = {}
+_heap_seq = itertools.count()
+_heap_lock = threading.Lock()
+_schedule_changed = threading.Event()
+MAX_ALARM_SLEEP = 60
+
+# save_alarms only marks the file dirty - a background thread writes it at most once per
+# SAVE_DEBOUNCE seconds so bursts of edits or triggers collapse into a single write
+ALARMS_FILE = "Configurables/Alarms/alarms.json"
+SAVE_DEBOUNCE = 2
+_alarms_dirty = threading.Event()
+persistence_thread = None
+
 def initialize():
     """Initialize alarm system"""
-    global is_alarm_system_running, alarm_thread
+    global is_alarm_system_running, alarm_thread, persistence_thread
     
     load_alarms()
     
@@ -23,26 +42,106 @@ def initialize():
     alarm_thread.daemon = True
     alarm_thread.start()
     
+    persistence_thread = threading.Thread(target=alarm_persistence_loop)
+    persistence_thread.daemon = True
+    persistence_thread.start()
+    atexit.register(flush_alarms)
+    
     utils.zw_logging.update_debug_log("Alarm system initialized")
 
 
+def next_fire_time(alarm: dict, now: datetime.datetime) -> datetime.datetime:
+    """Next datetime an alarm should go off - today at its time, or tomorrow if it already fired today"""
+    hour, minute = map(int, alarm["time"].split(":"))
+    fire_at = datetime.datetime.combine(now.date(), datetime.time(hour, minute))
+    # A time already past today that hasn't fired yet stays due, so an alarm missed while
+    # the process was down or the machine asleep still goes off once it is back
+    if alarm.get("last_triggered") == now.strftime("%Y-%m-%d"):
+        fire_at += datetime.timedelta(days=1)
+    return fire_at
+
+
+def schedule_alarm(alarm: dict, now: datetime.datetime = None):
+    """Push an alarm's next fire time onto the heap, replacing any earlier entry for it"""
+    if not alarm.get("enabled", True):
+        return
+    fire_at = next_fire_time(alarm, now or datetime.datetime.now())
+    with _heap_lock:
+        _scheduled[id(alarm)] = fire_at
+        heapq.heappush(alarm_heap, (fire_at, next(_heap_seq), alarm))
+    _schedule_changed.set()
+
+
+def unschedule_alarm(alarm: dict):
+    """Drop an alarm from the schedule - its heap entry is skipped when it reaches the top"""
+    with _heap_lock:
+        _scheduled.pop(id(alarm), None)
+
+
+def rebuild_schedule():
+    """Recompute fire times for every loaded alarm"""
+    global alarm_heap
+    
+    now = datetime.datetime.now()
+    entries = []
+    scheduled = {}
+    for alarm in active_alarms:
+        if not alarm.get("enabled", True):
+            continue
+        try:
+            fire_at = next_fire_time(alarm, now)
+        except (KeyError, ValueError) as e:
+            utils.zw_logging.update_debug_log(f"Skipping alarm with bad time {alarm.get('name')}: {e}")
+            continue
+        scheduled[id(alarm)] = fire_at
+        entries.append((fire_at, next(_heap_seq), alarm))
+    heapq.heapify(entries)
+    
+    with _heap_lock:
+        alarm_heap = entries
+        _scheduled.clear()
+        _scheduled.update(scheduled)
+    _schedule_changed.set()
+
+
+def _pop_due_alarm():
+    """Pop the soonest live alarm if it is due, otherwise return seconds to wait until it is"""
+    with _heap_lock:
+        while alarm_heap:
+            fire_at, _, alarm = alarm_heap[0]
+            if _scheduled.get(id(alarm)) != fire_at:
+                # Stale entry for a removed or rescheduled alarm
+                heapq.heappop(alarm_heap)
+                continue
+            wait = (fire_at - datetime.datetime.now()).total_seconds()
+            if wait > 0:
+                return None, wait
+            heapq.heappop(alarm_heap)
+            del _scheduled[id(alarm)]
+            return alarm, 0
+    return None, MAX_ALARM_SLEEP
+
+
 def alarm_monitoring_loop():
-    """Main alarm monitoring loop"""
+    """Main alarm monitoring loop - sleeps until the soonest alarm is due instead of polling"""
     while is_alarm_system_running:
         try:
-            current_time = datetime.datetime.now()
+            alarm, wait = _pop_due_alarm()
+            if alarm is None:
+                # Woken early whenever the schedule changes so a sooner alarm isn't missed
+                _schedule_changed.wait(min(wait, MAX_ALARM_SLEEP))
+                _schedule_changed.clear()
+                continue
             
-            # Check each active alarm
-            for alarm in active_alarms[:]:  # Copy list to avoid modification during iteration
-                if should_trigger_alarm(alarm, current_time):
-                    trigger_alarm(alarm)
-                    
-                    # Remove one-time alarms
-                    if not alarm.get("recurring", False):
-                        active_alarms.remove(alarm)
-                        save_alarms()
+            trigger_alarm(alarm)
             
-            time.sleep(10)  # Check every 10 seconds
+            if alarm.get("recurring", False):
+                schedule_alarm(alarm)
+            else:
+                # Remove one-time alarms
+                if alarm in active_alarms:
+                    active_alarms.remove(alarm)
+                save_alarms()
             
         except Exception as e:
             utils.zw_logging.update_debug_log(f"Alarm monitoring error: {e}")
@@ -51,6 +150,9 @@ def alarm_monitoring_loop():
 
 def should_trigger_alarm(alarm: dict, current_time: datetime.datetime) -> bool:
     """Check if alarm should be triggered"""
+    if not alarm.get("enabled", True):
+        return False
+    
     try:
         alarm_time = datetime.datetime.strptime(alarm["time"], "%H:%M")
         current_time_only = current_time.replace(second=0, microsecond=0)
@@ -119,6 +221,7 @@ def add_alarm(name: str, time_str: str, message: str = "", recurring: bool = Fal
         }
         
         active_alarms.append(new_alarm)
+        schedule_alarm(new_alarm)
         save_alarms()
         
         utils.zw_logging.update_debug_log(f"Alarm added: {name} at {time_str}")
@@ -137,6 +240,9 @@ def remove_alarm(alarm_name: str):
     global active_alarms
     
     try:
+        for alarm in active_alarms:
+            if alarm.get("name") == alarm_name:
+                unschedule_alarm(alarm)
         active_alarms = [alarm for alarm in active_alarms if alarm.get("name") != alarm_name]
         save_alarms()
         utils.zw_logging.update_debug_log(f"Alarm removed: {alarm_name}")
@@ -157,6 +263,10 @@ def toggle_alarm(alarm_name: str):
         for alarm in active_alarms:
             if alarm.get("name") == alarm_name:
                 alarm["enabled"] = not alarm.get("enabled", True)
+                if alarm["enabled"]:
+                    schedule_alarm(alarm)
+                else:
+                    unschedule_alarm(alarm)
                 save_alarms()
                 utils.zw_logging.update_debug_log(f"Alarm '{alarm_name}' {'enabled' if alarm['enabled'] else 'disabled'}")
                 return alarm["enabled"]
@@ -171,14 +281,13 @@ def load_alarms():
     global active_alarms
     
     try:
-        alarms_file = "Configurables/Alarms/alarms.json"
-        
-        if os.path.exists(alarms_file):
-            with open(alarms_file, 'r', encoding='utf-8') as f:
-                active_alarms = json.load(f)
+        if os.path.exists(ALARMS_FILE):
+            with open(ALARMS_FILE, 'rb') as f:
+                active_alarms = utils.fast_json.loads(f.read())
         else:
             active_alarms = []
-            
+        
+        rebuild_schedule()
         utils.zw_logging.update_debug_log(f"Loaded {len(active_alarms)} alarms")
         
     except Exception as e:
@@ -187,13 +296,35 @@ def load_alarms():
 
 
 def save_alarms():
-    """Save alarms to file"""
+    """Mark alarms as changed - the persistence thread writes them shortly after"""
+    _alarms_dirty.set()
+
+
+def alarm_persistence_loop():
+    """Write alarms to disk whenever they change, at most once per debounce window"""
+    while True:
+        _alarms_dirty.wait()
+        time.sleep(SAVE_DEBOUNCE)
+        _alarms_dirty.clear()
+        write_alarms()
+
+
+def flush_alarms():
+    """Write alarms immediately if there are unsaved changes"""
+    if _alarms_dirty.is_set():
+        _alarms_dirty.clear()
+        write_alarms()
+
+
+def write_alarms():
+    """Save alarms to file, via a temp file so a crash mid-write can't corrupt it"""
     try:
-        alarms_file = "Configurables/Alarms/alarms.json"
-        os.makedirs(os.path.dirname(alarms_file), exist_ok=True)
+        os.makedirs(os.path.dirname(ALARMS_FILE), exist_ok=True)
         
-        with open(alarms_file, 'w', encoding='utf-8') as f:
-            json.dump(active_alarms, f, ensure_ascii=False, indent=2)
+        tmp_file = ALARMS_FILE + ".tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(utils.fast_json.dumps(list(active_alarms), indent=True))
+        os.replace(tmp_file, ALARMS_FILE)
             
     except Exception as e:
         utils.zw_logging.update_debug_log(f"Error saving alarms: {e}")
@@ -203,6 +334,7 @@ def stop_alarm_system():
     """Stop the alarm system"""
     global is_alarm_system_running
     is_alarm_system_running = False
+    _schedule_changed.set()
     utils.zw_logging.update_debug_log("Alarm system stopped")
 
 
@@ -12,6 +12,7 @@ from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import utils.zw_logging
 import utils.cane_lib
+from utils import vector_kernels
 
 # RAG system variables
 rag_enabled = True
@@ -109,18 +110,11 @@ def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
         return 0.0
     
     # Convert to numpy arrays
-    a = np.array(vec1)
-    b = np.array(vec2)
+    a = np.asarray(vec1, dtype=np.float64)
+    b = np.asarray(vec2, dtype=np.float64)
     
-    # Calculate cosine similarity
-    dot_product = np.dot(a, b)
-    norm_a = np.linalg.norm(a)
-    norm_b = np.linalg.norm(b)
-    
-    if norm_a == 0 or norm_b == 0:
-        return 0.0
-    
-    return dot_product / (norm_a * norm_b)
+    # Dot product and norms in one fused pass where a compiled kernel is available
+    return vector_kernels.cosine(a, b)
 
 
 def add_conversation_to_rag(user_message: str, ai_response: str):
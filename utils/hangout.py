@@ -190,8 +190,8 @@ def process_hangout_input():
         import utils.audio
         import utils.transcriber_translate
         
-        audio_file = utils.audio.record()
-        transcript = utils.transcriber_translate.transcribe_voice_to_text(audio_file)
+        audio_buffer = utils.audio.record_to_buffer()
+        transcript = utils.transcriber_translate.transcribe_voice_to_text(audio_buffer)
         
         if not transcript or len(transcript.strip()) < 2:
             return
@@ -203,12 +203,6 @@ def process_hangout_input():
         
         if response_decision["should_respond"]:
             execute_hangout_response(transcript, response_decision)
-        
-        # Clean up audio file
-        try:
-            os.remove(audio_file)
-        except:
-            pass
             
     except Exception as e:
         utils.zw_logging.update_debug_log(f"Hangout input processing error: {e}")
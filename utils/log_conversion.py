@@ -1,8 +1,11 @@
-import json
 import os
 import re
 from datetime import datetime
 import utils.zw_logging
+import utils.fast_json
+
+LIVE_LOG_BUFFER_SIZE = 65536
+LIVE_LOG_TAIL_BYTES = 4096  # How far back from the end to look for the closing bracket
 
 def convert_old_logs_to_new_format():
     """Convert old log formats to new JSON format"""
@@ -162,8 +165,8 @@ def load_existing_live_log() -> list:
     """Load existing LiveLog.json"""
     try:
         if os.path.exists('LiveLog.json'):
-            with open('LiveLog.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open('LiveLog.json', 'rb') as f:
+                return utils.fast_json.loads(f.read())
         return []
     except Exception as e:
         utils.zw_logging.update_debug_log(f"Error loading existing log: {e}")
@@ -190,18 +193,61 @@ def remove_duplicate_entries(entries: list) -> list:
 def save_live_log(entries: list):
     """Save entries to LiveLog.json"""
     try:
-        with open('LiveLog.json', 'w', encoding='utf-8') as f:
-            json.dump(entries, f, ensure_ascii=False, indent=2)
+        with open('LiveLog.json', 'wb') as f:
+            f.write(utils.fast_json.dumps(entries, indent=True))
         
         # Also create backup
         backup_entries = entries[-50:] if len(entries) > 50 else entries
-        with open('LiveLogBlank.json', 'w', encoding='utf-8') as f:
-            json.dump(backup_entries, f, ensure_ascii=False, indent=2)
+        with open('LiveLogBlank.json', 'wb') as f:
+            f.write(utils.fast_json.dumps(backup_entries, indent=True))
             
     except Exception as e:
         utils.zw_logging.update_debug_log(f"Error saving live log: {e}")
 
 
+def append_live_log_entry(entry: list):
+    """Append one exchange to LiveLog.json in place, without re-reading or re-writing earlier entries"""
+    append_live_log_entries([entry])
+
+
+def append_live_log_entries(new_entries: list):
+    """Append several exchanges to LiveLog.json with a single in-place write"""
+    if not new_entries:
+        return
+    encoded = b',\n  '.join(utils.fast_json.dumps(entry) for entry in new_entries)
+    
+    try:
+        with open('LiveLog.json', 'r+b', buffering=LIVE_LOG_BUFFER_SIZE) as f:
+            end = f.seek(0, os.SEEK_END)
+            tail_start = max(0, end - LIVE_LOG_TAIL_BYTES)
+            f.seek(tail_start)
+            tail = f.read().rstrip()
+            
+            # Overwrite the closing bracket of the top-level array with the new entry
+            if tail.endswith(b']'):
+                body = tail[:-1].rstrip()
+                if body:
+                    separator = b'\n  ' if body.endswith(b'[') else b',\n  '
+                    f.seek(tail_start + len(body))
+                    f.write(separator + encoded + b'\n]')
+                    f.truncate()
+                    return
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        utils.zw_logging.update_debug_log(f"Error appending to live log: {e}")
+        return
+    
+    # Missing or unrecognised log file, rewrite it in full
+    try:
+        entries = load_existing_live_log()
+        entries.extend(new_entries)
+        with open('LiveLog.json', 'wb') as f:
+            f.write(utils.fast_json.dumps(entries, indent=True))
+    except Exception as e:
+        utils.zw_logging.update_debug_log(f"Error saving live log: {e}")
+
+
 def backup_current_logs():
     """Create backup of current logs"""
     try:
@@ -233,8 +279,8 @@ def get_log_statistics():
         }
         
         if os.path.exists('LiveLog.json'):
-            with open('LiveLog.json', 'r', encoding='utf-8') as f:
-                log_data = json.load(f)
+            with open('LiveLog.json', 'rb') as f:
+                log_data = utils.fast_json.loads(f.read())
             
             stats["total_conversations"] = len(log_data)
             stats["total_user_messages"] = len([entry for entry in log_data if len(entry) > 0])
@@ -11,7 +11,7 @@ gaming_enabled = False
 
 # Audio settings
 autochat_enabled = True
-autochat_mininum_chat_frames = 30
+autochat_mininum_chat_frames = 30  # In ~23 ms frames (1024 samples at 44.1 kHz), whatever rate the mic captures at
 silero_vad_enabled = True
 chunk_audio = True
 max_chunk_count = 14
@@ -1,14 +1,19 @@
 import whisper
+import numpy as np
+import io
 import os
+import wave
 import threading
-import time
 import utils.settings
 import utils.zw_logging
 
+WHISPER_SAMPLE_RATE = 16000
+
 # Global transcription variables
 whisper_model = None
 transcription_chunks = []
 chunky_request = None
+transcription_cv = threading.Condition()  # Notified when chunky_request finishes
 is_transcribing = False
 
 def initialize():
@@ -32,8 +37,27 @@ def initialize():
             raise e2
 
 
-def transcribe_voice_to_text(audio_file: str) -> str:
-    """Transcribe audio file to text"""
+def _to_whisper_audio(audio):
+    """Convert an in-memory WAV to the float32 16 kHz array Whisper takes, paths pass through"""
+    if isinstance(audio, str):
+        return audio
+    
+    with wave.open(io.BytesIO(audio), 'rb') as wf:
+        rate = wf.getframerate()
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16).astype(np.float32) / 32768.0
+    
+    # The microphone may have fallen back to its native rate
+    if rate != WHISPER_SAMPLE_RATE and len(samples):
+        target_len = int(len(samples) * WHISPER_SAMPLE_RATE / rate)
+        samples = np.interp(
+            np.linspace(0, len(samples) - 1, target_len), np.arange(len(samples)), samples
+        ).astype(np.float32)
+    
+    return samples
+
+
+def transcribe_voice_to_text(audio_file) -> str:
+    """Transcribe audio file path or in-memory WAV bytes to text"""
     global is_transcribing
     
     if not whisper_model:
@@ -50,7 +74,7 @@ def transcribe_voice_to_text(audio_file: str) -> str:
         else:
             # Standard transcription
             result = whisper_model.transcribe(
-                audio_file,
+                _to_whisper_audio(audio_file),
                 language="en" if "en" in os.getenv("WHISPER_MODEL", "base") else None,
                 temperature=0.0  # Reduce hallucinations
             )
@@ -66,7 +90,7 @@ def transcribe_voice_to_text(audio_file: str) -> str:
         is_transcribing = False
 
 
-def start_chunked_transcription(audio_file: str):
+def start_chunked_transcription(audio_file):
     """Start chunked transcription in background"""
     global chunky_request
     
@@ -76,7 +100,7 @@ def start_chunked_transcription(audio_file: str):
         try:
             # This is a simplified version - real implementation would 
             # process audio in chunks as it's being recorded
-            result = whisper_model.transcribe(audio_file, temperature=0.0)
+            result = whisper_model.transcribe(_to_whisper_audio(audio_file), temperature=0.0)
             
             # Split result into chunks (simulate chunk processing)
             words = result["text"].split()
@@ -85,16 +109,25 @@ def start_chunked_transcription(audio_file: str):
             for i in range(0, len(words), chunk_size):
                 chunk = " ".join(words[i:i + chunk_size])
                 transcription_chunks.append(chunk)
-                time.sleep(0.1)  # Simulate processing time
                 
         except Exception as e:
             utils.zw_logging.update_debug_log(f"Chunked transcription error: {e}")
         finally:
-            chunky_request = None
+            with transcription_cv:
+                chunky_request = None
+                transcription_cv.notify_all()
     
-    chunky_request = threading.Thread(target=transcribe_chunks)
-    chunky_request.daemon = True
-    chunky_request.start()
+    # Published under the condition so waiters never see a half-started request
+    with transcription_cv:
+        chunky_request = threading.Thread(target=transcribe_chunks)
+        chunky_request.daemon = True
+        chunky_request.start()
+
+
+def wait_for_chunked_transcription():
+    """Block until the background chunked transcription has finished"""
+    with transcription_cv:
+        transcription_cv.wait_for(lambda: chunky_request is None)
 
 
 def clear_transcription_chunks():
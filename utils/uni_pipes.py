@@ -6,6 +6,8 @@ import main
 
 # Pipe management variables
 main_pipe_running = False
+main_pipe_done = threading.Event()  # Set whenever no main pipe is running
+main_pipe_done.set()
 active_pipes = {}
 pipe_queue = queue.Queue()
 pipe_manager_thread = None
@@ -25,12 +27,9 @@ def pipe_manager_loop():
     """Main pipe manager loop"""
     while True:
         try:
-            # Process queued pipes
-            if not pipe_queue.empty():
-                pipe_data = pipe_queue.get_nowait()
-                execute_pipe(pipe_data)
-            
-            time.sleep(0.01)
+            # Process queued pipes, blocking until one arrives
+            pipe_data = pipe_queue.get()
+            execute_pipe(pipe_data)
             
         except Exception as e:
             utils.zw_logging.update_debug_log(f"Pipe manager error: {e}")
@@ -43,6 +42,7 @@ def start_new_pipe(desired_process: str, is_main_pipe: bool = False):
     
     if is_main_pipe:
         main_pipe_running = True
+        main_pipe_done.clear()
     
     pipe_data = {
         "process": desired_process,
@@ -102,12 +102,14 @@ def execute_pipe(pipe_data: str):
     finally:
         if is_main:
             main_pipe_running = False
+            main_pipe_done.set()
 
 
 def stop_main_pipe():
     """Stop the main pipe"""
     global main_pipe_running
     main_pipe_running = False
+    main_pipe_done.set()
 
 
 def get_pipe_status():
@@ -0,0 +1,89 @@
+import numpy as np
+
+# numba is optional - it compiles the scoring loop to SIMD machine code and spreads rows
+# across cores, but the NumPy path gives the same results without it
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+# simsimd is optional too - its hand-written kernels pick AVX-512/VNNI or NEON at runtime
+# and are preferred over both of the above when installed
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
+
+def _int8_dots_numpy(matrix, query):
+    """int32-accumulated dot of each int8 row with an int8 query"""
+    return matrix.astype(np.int32) @ query.astype(np.int32)
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _int8_dots_numba(matrix, query):
+        out = np.empty(matrix.shape[0], dtype=np.int32)
+        for i in prange(matrix.shape[0]):
+            acc = np.int32(0)
+            for j in range(matrix.shape[1]):
+                acc += np.int32(matrix[i, j]) * np.int32(query[j])
+            out[i] = acc
+        return out
+    
+    @njit(fastmath=True, cache=True)
+    def _cosine_numba(a, b):
+        # Dot product and both norms accumulated in one pass over the data
+        dot = 0.0
+        norm_a = 0.0
+        norm_b = 0.0
+        for i in range(a.shape[0]):
+            dot += a[i] * b[i]
+            norm_a += a[i] * a[i]
+            norm_b += b[i] * b[i]
+        if norm_a == 0.0 or norm_b == 0.0:
+            return 0.0
+        return dot / np.sqrt(norm_a * norm_b)
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> float:
+    """Cosine similarity of two equal-length float vectors, 0.0 if either is all zeros"""
+    if simsimd is not None:
+        if not a.any() or not b.any():
+            return 0.0
+        return 1.0 - float(simsimd.cosine(a, b))
+    if njit is not None:
+        return float(_cosine_numba(a, b))
+    norm = np.linalg.norm(a) * np.linalg.norm(b)
+    if norm == 0:
+        return 0.0
+    return float(np.dot(a, b) / norm)
+
+
+def normalized_dot(a: np.ndarray, b: np.ndarray) -> float:
+    """Cosine similarity of two vectors already scaled to unit length - just the dot product"""
+    return float(a @ b)
+
+
+def int8_similarities(matrix: np.ndarray, scales: np.ndarray, query: np.ndarray, query_scale: float) -> np.ndarray:
+    """Similarity of a quantized normalized query against quantized normalized rows"""
+    if simsimd is not None and matrix.shape[0] > 0:
+        if not query.any():
+            return np.zeros(matrix.shape[0], dtype=np.float32)
+        distances = np.asarray(simsimd.cdist(query.reshape(1, -1), matrix, metric='cosine'), dtype=np.float32)
+        return 1.0 - distances[0]
+    return int8_dots(matrix, query).astype(np.float32) * scales * np.float32(query_scale)
+
+
+def int8_dots(matrix: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Dot products of an (N, D) int8 matrix with a (D,) int8 query, accumulated in int32"""
+    if njit is not None and matrix.shape[0] > 0:
+        return _int8_dots_numba(np.ascontiguousarray(matrix), np.ascontiguousarray(query))
+    return _int8_dots_numpy(matrix, query)
+
+
+def warm_up():
+    """Trigger JIT compilation up front so the first search doesn't pay for it"""
+    if njit is not None:
+        _int8_dots_numba(np.zeros((1, 1), dtype=np.int8), np.zeros(1, dtype=np.int8))
+        _cosine_numba(np.zeros(1, dtype=np.float32), np.zeros(1, dtype=np.float32))
@@ -9,6 +9,8 @@ import utils.zw_logging
 tts_engine = None
 is_speaking = False
 should_stop_speaking = False
+speaking_done = threading.Event()  # Set whenever is_speaking is False
+speaking_done.set()
 
 def initialize():
     """Initialize text-to-speech engine"""
@@ -37,22 +39,25 @@ def initialize():
 
 def speak_line(text: str, refuse_pause: bool = False):
     """Speak the given text"""
-    global is_speaking, should_stop_speaking
+    global should_stop_speaking
     
     if not tts_engine:
         utils.zw_logging.update_debug_log("TTS engine not available")
+        set_speaking(False)
         return
     
     if not text or text.strip() == "":
+        set_speaking(False)
         return
     
     # Clean text for speech
     clean_text = clean_text_for_speech(text)
     
     if not clean_text:
+        set_speaking(False)
         return
     
-    is_speaking = True
+    set_speaking(True)
     should_stop_speaking = False
     
     try:
@@ -65,28 +70,26 @@ def speak_line(text: str, refuse_pause: bool = False):
         
         # Run the speech in a separate thread to allow interruption
         def run_speech():
-            global is_speaking
             try:
                 tts_engine.runAndWait()
             except Exception as e:
                 utils.zw_logging.update_debug_log(f"Speech error: {e}")
             finally:
-                is_speaking = False
+                set_speaking(False)
         
         speech_thread = threading.Thread(target=run_speech)
         speech_thread.daemon = True
         speech_thread.start()
         
         # Wait for speech to complete or be interrupted
-        while speech_thread.is_alive() and not should_stop_speaking:
-            time.sleep(0.01)
+        speaking_done.wait()
         
         if should_stop_speaking:
             force_cut_voice()
         
     except Exception as e:
         utils.zw_logging.update_debug_log(f"Speech error: {e}")
-        is_speaking = False
+        set_speaking(False)
 
 
 def clean_text_for_speech(text: str) -> str:
@@ -117,6 +120,10 @@ def set_speaking(speaking: bool):
     """Set speaking state"""
     global is_speaking
     is_speaking = speaking
+    if speaking:
+        speaking_done.clear()
+    else:
+        speaking_done.set()
 
 
 def check_if_speaking() -> bool:
@@ -126,7 +133,7 @@ def check_if_speaking() -> bool:
 
 def force_cut_voice():
     """Force stop current speech"""
-    global should_stop_speaking, is_speaking
+    global should_stop_speaking
     
     should_stop_speaking = True
     
@@ -136,7 +143,7 @@ def force_cut_voice():
     except Exception as e:
         utils.zw_logging.update_debug_log(f"Error stopping speech: {e}")
     
-    is_speaking = False
+    set_speaking(False)
 
 
 def adjust_volume(delta: float):